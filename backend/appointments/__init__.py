@@ -0,0 +1 @@
+# Appointments app
@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class AppointmentsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'appointments'
+
+    def ready(self):
+        # Register signal handlers
+        from . import signals  # noqa: F401
+
+        # Start writing queued log records in the background
+        from dr_vivek_shetty.log_handlers import start_log_listeners
+        start_log_listeners()
@@ -0,0 +1,40 @@
+"""
+Conditional GET helpers (ETag / If-None-Match) for API views
+"""
+
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def make_etag(*parts):
+    """Build a quoted ETag from validator parts, or None when any validator is unknown"""
+    if any(part is None for part in parts):
+        return None
+    return quote_etag('-'.join(str(part) for part in parts))
+
+
+def etag_matches(request, etag):
+    """Check whether the request's If-None-Match header matches an ETag"""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match or etag is None:
+        return False
+
+    # Weak comparison, as used for If-None-Match
+    etags = {tag[2:] if tag.startswith('W/') else tag for tag in parse_etags(if_none_match)}
+    return '*' in etags or etag in etags
+
+
+def not_modified_response(etag):
+    """Return an empty 304 Not Modified response carrying the ETag"""
+    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    response['ETag'] = etag
+    return response
+
+
+def with_etag(response, etag):
+    """Attach an ETag to a successful response and ask clients to revalidate it"""
+    if response.status_code == status.HTTP_200_OK and etag is not None:
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,129 @@
+"""
+In-memory interval indexes for availability overlap checks
+"""
+
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+
+class IntervalIndex:
+    """
+    Half-open [start, end) intervals sorted by start, with a running maximum
+    of end points. "Does anything overlap?" is one bisect, and listing the
+    overlaps only visits intervals that could reach the query.
+    """
+
+    def __init__(self, intervals=()):
+        self.intervals = sorted(intervals, key=lambda interval: (interval[0], interval[1]))
+        self.starts = [start for start, _, _ in self.intervals]
+        self.max_ends = list(accumulate((end for _, end, _ in self.intervals), max))
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def overlaps(self, start, end):
+        """Whether any interval overlaps [start, end)"""
+        count = bisect_left(self.starts, end)
+        return count > 0 and self.max_ends[count - 1] > start
+
+    def overlapping(self, start, end):
+        """Items of every interval overlapping [start, end)"""
+        count = bisect_left(self.starts, end)
+        # Everything before the first running maximum past start ends too early
+        first = bisect_right(self.max_ends, start, 0, count)
+        return [item for interval_start, interval_end, item in self.intervals[first:count] if interval_end > start]
+
+    def overlapping_pairs(self):
+        """Every pair of overlapping items, found in one sweep"""
+        pairs = []
+        active = []
+        for start, end, item in self.intervals:
+            active = [(active_end, active_item) for active_end, active_item in active if active_end > start]
+            pairs.extend((active_item, item) for _, active_item in active)
+            active.append((end, item))
+        return pairs
+
+
+class AvailabilityIndex:
+    """
+    Interval indexes over availability rows, one per doctor and weekday for
+    recurring rules and one per doctor and date for dated entries.
+
+    Rows are dicts with doctor_id, is_recurring, day_of_week, date and
+    start/end in minutes. Different doctors never conflict. Dated entries
+    add to the recurring rules of their weekday, so each is checked against
+    those rules as well as its own date. A recurring rule is only checked
+    against dated entries from dated_from on, since past dates can't clash
+    with it.
+    """
+
+    def __init__(self, rows):
+        recurring = {}
+        dated = {}
+        for row in rows:
+            interval = (row['start'], row['end'], row)
+            if row['is_recurring']:
+                recurring.setdefault((row['doctor_id'], row['day_of_week']), []).append(interval)
+            else:
+                dated.setdefault((row['doctor_id'], row['date']), []).append(interval)
+
+        self.recurring = {key: IntervalIndex(intervals) for key, intervals in recurring.items()}
+        self.dated = {key: IntervalIndex(intervals) for key, intervals in dated.items()}
+        self.dates_by_weekday = {}
+        for doctor_id, day in sorted(self.dated, key=lambda key: key[1]):
+            self.dates_by_weekday.setdefault((doctor_id, day.weekday()), []).append(day)
+
+    def _candidate_indexes(self, row, include_recurring=True, dated_from=None):
+        empty = IntervalIndex()
+        doctor_id = row['doctor_id']
+        if row['is_recurring']:
+            weekday = row['day_of_week']
+            days = self.dates_by_weekday.get((doctor_id, weekday), [])
+            if dated_from is not None:
+                days = days[bisect_left(days, dated_from):]
+            indexes = [self.dated[(doctor_id, day)] for day in days]
+            if include_recurring:
+                indexes.append(self.recurring.get((doctor_id, weekday), empty))
+            return indexes
+
+        indexes = [self.dated.get((doctor_id, row['date']), empty)]
+        if include_recurring:
+            indexes.append(self.recurring.get((doctor_id, row['date'].weekday()), empty))
+        return indexes
+
+    def overlaps(self, row, include_recurring=True, dated_from=None):
+        """Whether the row's [start, end) overlaps any indexed row of the same doctor"""
+        return any(
+            index.overlaps(row['start'], row['end'])
+            for index in self._candidate_indexes(row, include_recurring, dated_from)
+        )
+
+    def overlapping(self, row, include_recurring=True, dated_from=None):
+        """Indexed rows of the same doctor overlapping the row's [start, end)"""
+        rows = []
+        for index in self._candidate_indexes(row, include_recurring, dated_from):
+            rows.extend(index.overlapping(row['start'], row['end']))
+        return rows
+
+    def overlapping_pairs(self, start_date=None):
+        """
+        Every overlapping pair of rows: recurring rules on the same weekday,
+        and dated entries against each other and their weekday's rules.
+        Dated entries before start_date are skipped.
+        """
+        pairs = []
+        for key in sorted(self.recurring, key=lambda key: (key[0] or 0, key[1])):
+            pairs.extend(self.recurring[key].overlapping_pairs())
+
+        for doctor_id, day in sorted(self.dated, key=lambda key: (key[0] or 0, key[1])):
+            if start_date and day < start_date:
+                continue
+            recurring = self.recurring.get((doctor_id, day.weekday()), IntervalIndex())
+            combined = IntervalIndex(self.dated[(doctor_id, day)].intervals + recurring.intervals)
+            # Recurring pairs were already reported for the weekday
+            pairs.extend(
+                (first, second) for first, second in combined.overlapping_pairs()
+                if not (first['is_recurring'] and second['is_recurring'])
+            )
+
+        return pairs
@@ -0,0 +1,260 @@
+"""
+Management command to benchmark slot generation, booking and listing
+"""
+
+import json
+import random
+import time
+from datetime import date, timedelta
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.utils import timezone
+
+from authentication.views import CustomTokenObtainPairSerializer
+
+from appointments.middleware import percentile
+from appointments.models import Appointment, DoctorAvailability
+from appointments.utils import (
+    format_minutes,
+    generate_time_slots,
+    get_available_slots_for_date,
+    is_slot_available,
+    minutes_to_time,
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark slot, booking and listing code paths against a seeded test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--appointments',
+            type=int,
+            default=1000,
+            help='Number of appointments to seed (default: 1000)'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=60,
+            help='Number of days the seeded appointments are spread over (default: 60)'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=50,
+            help='Timed iterations per benchmark (default: 50)'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=5,
+            help='Untimed iterations run before each benchmark (default: 5)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed for the synthetic data (default: 42)'
+        )
+        parser.add_argument(
+            '--label',
+            type=str,
+            default='',
+            help='Free-form label stored in the output, e.g. a commit hash'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            default='',
+            help='Write the JSON results to this file instead of stdout'
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+
+        # Run against a throwaway test database and a private cache so real
+        # data and shared cache keys (schedule versions, templates) are never touched
+        bench_cache = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench'}}
+        with override_settings(CACHES=bench_cache):
+            setup_test_environment()
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                self.seed(options['appointments'], options['days'], options['iterations'] + options['warmup'])
+                benchmarks = self.run_benchmarks(options['iterations'], options['warmup'])
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        results = {
+            'label': options['label'],
+            'timestamp': timezone.now().isoformat(),
+            'django_version': django.get_version(),
+            'database': connection.vendor,
+            'scale': {
+                'appointments': self.seeded_appointments,
+                'days': options['days'],
+                'availability_rules': self.seeded_rules,
+                'iterations': options['iterations'],
+            },
+            'benchmarks': benchmarks,
+        }
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                output_file.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Benchmark results written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def seed(self, appointment_count, days, booking_runs):
+        """Seed availability rules and appointments, keeping booking_runs slots free"""
+        # Monday to Friday 9:00-18:00, Saturday 9:00-14:00, 30-minute slots
+        rules = [
+            DoctorAvailability(
+                is_recurring=True,
+                day_of_week=day,
+                start_time=minutes_to_time(9 * 60),
+                end_time=minutes_to_time((14 if day == 5 else 18) * 60),
+                slot_duration=30
+            )
+            for day in range(6)
+        ]
+        DoctorAvailability.objects.bulk_create(rules)
+        self.seeded_rules = len(rules)
+
+        # Every bookable (date, minutes) slot in the seeded window
+        first_day = date.today() + timedelta(days=1)
+        self.slot_grid = [
+            (first_day + timedelta(days=offset), slot_minutes)
+            for offset in range(days)
+            for rule in rules if rule.day_of_week == (first_day + timedelta(days=offset)).weekday()
+            for slot_minutes in generate_time_slots(rule.start_time, rule.end_time, rule.slot_duration)
+        ]
+        self.random.shuffle(self.slot_grid)
+
+        # Set free slots aside for the booking benchmark before seeding the rest
+        self.free_slots = self.slot_grid[:booking_runs]
+        if len(self.free_slots) < booking_runs:
+            raise CommandError(
+                f'Only {len(self.slot_grid)} slots in {days} days; the booking benchmark needs '
+                f'{booking_runs} free slots. Increase --days or lower --iterations.'
+            )
+        booked = self.slot_grid[booking_runs:booking_runs + appointment_count]
+        if len(booked) < appointment_count:
+            self.stderr.write(self.style.WARNING(
+                f'Only {len(booked)} slots available in {days} days; seeding {len(booked)} appointments'
+            ))
+
+        statuses = ['pending', 'confirmed', 'completed', 'cancelled', 'no_show']
+        Appointment.objects.bulk_create([
+            Appointment(
+                patient_name=f'Patient {index}',
+                patient_email=f'patient{index}@example.com',
+                patient_phone='9886432371',
+                appointment_date=appointment_date,
+                appointment_time=minutes_to_time(slot_minutes),
+                reason='initial_consultation',
+                status=self.random.choice(statuses)
+            )
+            for index, (appointment_date, slot_minutes) in enumerate(booked)
+        ], batch_size=500)
+        self.seeded_appointments = len(booked)
+        self.booked_slots = booked
+
+    def run_benchmarks(self, iterations, warmup):
+        """Time every benchmark and return their summaries"""
+        admin = User.objects.create_superuser('bench_admin', 'bench@example.com', 'bench-password')
+        # Tokens carry the same claims as a real login, so requests take the claims auth path
+        access_token = CustomTokenObtainPairSerializer.get_token(admin).access_token
+        admin_client = Client(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        public_client = Client()
+
+        sample_dates = sorted({appointment_date for appointment_date, _ in self.slot_grid})
+        booked_slots = self.booked_slots or self.slot_grid
+        booking_slots = iter(self.free_slots)
+
+        def book():
+            appointment_date, slot_minutes = next(booking_slots)
+            return public_client.post('/api/appointments/book/', {
+                'patient_name': 'Bench Patient',
+                'patient_email': 'bench@example.com',
+                'patient_phone': '9886432371',
+                'appointment_date': appointment_date.isoformat(),
+                'appointment_time': format_minutes(slot_minutes),
+                'reason': 'follow_up'
+            }, content_type='application/json')
+
+        pages = max(1, self.seeded_appointments // 10)
+        benchmarks = {
+            'get_available_slots_for_date': lambda: get_available_slots_for_date(
+                self.random.choice(sample_dates)
+            ),
+            'is_slot_available': lambda: is_slot_available(*self._random_slot(booked_slots)),
+            'book_appointment': book,
+            'appointment_list': lambda: admin_client.get(
+                '/api/appointments/', {'page': self.random.randint(1, pages), 'limit': 10}
+            ),
+            'appointment_stats': lambda: admin_client.get('/api/appointments/stats/'),
+        }
+
+        results = {}
+        for name, benchmark in benchmarks.items():
+            results[name] = self.measure(benchmark, iterations + warmup, warmup)
+        return results
+
+    def _random_slot(self, slots):
+        appointment_date, slot_minutes = self.random.choice(slots)
+        return appointment_date, minutes_to_time(slot_minutes)
+
+    def measure(self, benchmark, runs, warmup):
+        """Run a benchmark and summarize its latency and query counts"""
+        durations = []
+        query_counts = []
+        status_codes = {}
+
+        for run in range(runs):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                result = benchmark()
+                duration = (time.perf_counter() - start) * 1000
+
+            if run < warmup:
+                continue
+
+            durations.append(duration)
+            query_counts.append(len(queries))
+            status_code = getattr(result, 'status_code', None)
+            if status_code is not None:
+                status_codes[str(status_code)] = status_codes.get(str(status_code), 0) + 1
+
+        if not durations:
+            return {'iterations': 0}
+
+        durations.sort()
+        query_counts.sort()
+        summary = {
+            'iterations': len(durations),
+            'p50_ms': round(percentile(durations, 0.50), 3),
+            'p95_ms': round(percentile(durations, 0.95), 3),
+            'p99_ms': round(percentile(durations, 0.99), 3),
+            'mean_ms': round(sum(durations) / len(durations), 3),
+            'queries': {
+                'p50': percentile(query_counts, 0.50),
+                'max': query_counts[-1],
+            },
+        }
+        if status_codes:
+            summary['status_codes'] = status_codes
+        return summary
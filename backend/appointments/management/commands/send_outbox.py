@@ -0,0 +1,66 @@
+"""
+Management command to deliver queued emails from the email outbox
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from appointments.utils import deliver_outbox_batch
+
+
+class Command(BaseCommand):
+    help = 'Send queued emails from the email outbox in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+            help=f'Messages sent per SMTP connection (default: {settings.EMAIL_OUTBOX_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+            help=f'Attempts before a message is marked failed (default: {settings.EMAIL_OUTBOX_MAX_ATTEMPTS})'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling the outbox instead of exiting once it is drained'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=10,
+            help='Seconds to wait between polls in --loop mode (default: 10)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            totals = self.drain(options['batch_size'], options['max_attempts'])
+
+            if totals['sent'] or totals['retrying'] or totals['failed']:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Outbox: {totals['sent']} sent, {totals['retrying']} retrying, "
+                        f"{totals['failed']} failed"
+                    )
+                )
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def drain(self, batch_size, max_attempts):
+        """Deliver batches until no due messages are left"""
+        totals = {'sent': 0, 'retrying': 0, 'failed': 0}
+
+        while True:
+            results = deliver_outbox_batch(batch_size, max_attempts)
+            for key, count in results.items():
+                totals[key] += count
+            if sum(results.values()) < batch_size:
+                return totals
@@ -0,0 +1,160 @@
+"""
+Per-request SQL query counting and latency instrumentation
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+
+# Metrics kept per URL name; all values are per request
+METRIC_FIELDS = ['total_ms', 'view_ms', 'render_ms', 'db_ms', 'queries']
+
+
+class RequestMetrics:
+    """Rolling in-memory samples of request metrics, keyed by URL name.
+
+    Samples live in process memory, so each worker process reports on the
+    requests it served itself.
+    """
+
+    def __init__(self, max_samples=500):
+        self.max_samples = max_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, url_name, sample):
+        """Store one request's metrics, evicting the oldest beyond max_samples"""
+        with self._lock:
+            samples = self._samples.get(url_name)
+            if samples is None:
+                samples = self._samples[url_name] = deque(maxlen=self.max_samples)
+            samples.append(sample)
+
+    def summary(self):
+        """Get count and p50/p95/p99/max of every metric for each URL name"""
+        with self._lock:
+            snapshot = {url_name: list(samples) for url_name, samples in self._samples.items()}
+
+        summary = {}
+        for url_name, samples in sorted(snapshot.items()):
+            summary[url_name] = {'count': len(samples)}
+            for field in METRIC_FIELDS:
+                values = sorted(sample[field] for sample in samples)
+                summary[url_name][field] = {
+                    'p50': percentile(values, 0.50),
+                    'p95': percentile(values, 0.95),
+                    'p99': percentile(values, 0.99),
+                    'max': values[-1],
+                }
+        return summary
+
+    def reset(self):
+        """Drop all recorded samples"""
+        with self._lock:
+            self._samples.clear()
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted, non-empty list"""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+request_metrics = RequestMetrics(max_samples=getattr(settings, 'REQUEST_METRICS_MAX_SAMPLES', 500))
+
+
+class _RequestTimings:
+    """Timing marks and SQL counters collected while serving one request"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.view_start = None
+        self.render_start = None
+        self.render_end = None
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+class RequestMetricsMiddleware:
+    """Record query count, SQL time, view time and serialization time per request.
+
+    Metrics are added to the rolling per-URL-name histogram in
+    request_metrics, and returned in a Server-Timing header to staff users
+    only, so timings aren't exposed on public endpoints. Keep this middleware
+    last in MIDDLEWARE so view and render timings exclude the other middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        timings = _RequestTimings()
+        request._request_timings = timings
+        start = time.perf_counter()
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings.execute_wrapper))
+            response = self.get_response(request)
+
+        end = time.perf_counter()
+        view_start = timings.view_start or start
+        view_end = timings.render_start or end
+        render_ms = (timings.render_end - timings.render_start) * 1000 if timings.render_end else 0.0
+
+        sample = {
+            'total_ms': round((end - start) * 1000, 3),
+            'view_ms': round((view_end - view_start) * 1000, 3),
+            'render_ms': round(render_ms, 3),
+            'db_ms': round(timings.db_time * 1000, 3),
+            'queries': timings.queries,
+        }
+
+        # DRF views set request.user to the token's user once authenticated
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={sample["db_ms"]};desc="{sample["queries"]} queries"',
+                f'view;dur={sample["view_ms"]}',
+                f'render;dur={sample["render_ms"]}',
+                f'total;dur={sample["total_ms"]}',
+            ])
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is not None and resolver_match.url_name:
+            request_metrics.record(resolver_match.view_name, sample)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = getattr(request, '_request_timings', None)
+        if timings is not None:
+            timings.view_start = time.perf_counter()
+        return None
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered (serialized) right after this hook
+        timings = getattr(request, '_request_timings', None)
+        if timings is not None:
+            timings.render_start = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: self._mark_rendered(timings))
+        return response
+
+    @staticmethod
+    def _mark_rendered(timings):
+        timings.render_end = time.perf_counter()
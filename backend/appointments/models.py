@@ -23,6 +23,15 @@ class DoctorAvailability(models.Model):
     
     availability_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     
+    # Doctor this schedule belongs to; empty for the practice's unassigned schedule
+    doctor = models.ForeignKey(
+        'DoctorProfile',
+        on_delete=models.CASCADE,
+        related_name='availability',
+        null=True,
+        blank=True
+    )
+    
     # Recurring availability (for weekly schedule)
     is_recurring = models.BooleanField(default=False)
     day_of_week = models.IntegerField(choices=DAY_CHOICES, null=True, blank=True)
@@ -43,6 +52,12 @@ class DoctorAvailability(models.Model):
     class Meta:
         ordering = ['day_of_week', 'start_time', 'date']
         verbose_name_plural = "Doctor Availabilities"
+        indexes = [
+            # Recurring rules for a weekday and overrides for a date. The
+            # boolean flags come last: SQLite can't seek on a bare boolean
+            models.Index(fields=['day_of_week', 'is_recurring', 'is_active'], name='availability_weekday_idx'),
+            models.Index(fields=['date', 'is_recurring', 'is_active'], name='availability_date_idx'),
+        ]
     
     def __str__(self):
         if self.is_recurring:
@@ -50,6 +65,57 @@ class DoctorAvailability(models.Model):
         return f"{self.date} {self.start_time}-{self.end_time}"
 
 
+class AvailabilityException(models.Model):
+    """Model for blocked dates or hours (holidays, leave) that override availability"""
+    
+    exception_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    
+    # Doctor on leave; empty for practice-wide closures that block every doctor
+    doctor = models.ForeignKey(
+        'DoctorProfile',
+        on_delete=models.CASCADE,
+        related_name='availability_exceptions',
+        null=True,
+        blank=True
+    )
+    
+    # Inclusive date range the block applies to
+    start_date = models.DateField()
+    end_date = models.DateField()
+    
+    # Optional daily time window; the whole day is blocked when both are empty
+    start_time = models.TimeField(null=True, blank=True)
+    end_time = models.TimeField(null=True, blank=True)
+    
+    reason = models.CharField(max_length=200, blank=True)
+    
+    # Metadata
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    is_active = models.BooleanField(default=True)
+    
+    class Meta:
+        ordering = ['start_date', 'start_time']
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(end_date__gte=models.F('start_date')),
+                name='exception_date_range_valid',
+            ),
+        ]
+        indexes = [
+            # Range lookups filter on both ends of the block
+            models.Index(fields=['start_date', 'end_date', 'is_active'], name='exception_range_idx'),
+        ]
+    
+    @property
+    def is_full_day(self):
+        return self.start_time is None and self.end_time is None
+    
+    def __str__(self):
+        window = 'all day' if self.is_full_day else f"{self.start_time}-{self.end_time}"
+        return f"Blocked {self.start_date} to {self.end_date} ({window})"
+
+
 class Appointment(models.Model):
     """Model for patient appointments"""
     
@@ -95,7 +161,7 @@ class Appointment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
-    # Doctor reference (if multiple doctors in future)
+    # Doctor reference; empty for bookings against the unassigned schedule
     doctor = models.ForeignKey(
         'DoctorProfile',
         on_delete=models.CASCADE,
@@ -106,7 +172,34 @@ class Appointment(models.Model):
     
     class Meta:
         ordering = ['appointment_date', 'appointment_time']
-        unique_together = ['appointment_date', 'appointment_time', 'doctor']
+        constraints = [
+            # One active booking per doctor and slot; cancelled and completed
+            # appointments don't hold the slot
+            models.UniqueConstraint(
+                fields=['appointment_date', 'appointment_time', 'doctor'],
+                condition=models.Q(status__in=['pending', 'confirmed'], doctor__isnull=False),
+                name='unique_active_slot_per_doctor',
+            ),
+            # NULL doctors never compare equal, so reserve active slots
+            # without a doctor with their own partial unique index
+            models.UniqueConstraint(
+                fields=['appointment_date', 'appointment_time'],
+                condition=models.Q(status__in=['pending', 'confirmed'], doctor__isnull=True),
+                name='unique_active_slot_without_doctor',
+            ),
+        ]
+        indexes = [
+            # Slot checks filter on date, time and status
+            models.Index(fields=['appointment_date', 'appointment_time', 'status'], name='appointment_slot_status_idx'),
+            # Booked-times lookups only ever read active appointments
+            models.Index(
+                fields=['appointment_date', 'appointment_time'],
+                condition=models.Q(status__in=['pending', 'confirmed']),
+                name='appointment_active_slot_idx',
+            ),
+            # Admin listing, newest first
+            models.Index(fields=['-created_at', '-appointment_id'], name='appointment_recent_idx'),
+        ]
     
     def __str__(self):
         return f"{self.patient_name} - {self.appointment_date} {self.appointment_time}"
@@ -189,3 +282,42 @@ class NewsletterSubscription(models.Model):
     
     def __str__(self):
         return self.email
+
+
+class EmailOutbox(models.Model):
+    """Model for queued outgoing emails, delivered by the send_outbox command"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    outbox_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    
+    # Message content
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True, null=True)
+    from_email = models.CharField(max_length=254, blank=True)
+    recipients = models.JSONField(default=list)
+    
+    # Delivery state
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        verbose_name_plural = "Email Outbox"
+        indexes = [
+            # The worker polls for due pending/sending messages
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
@@ -5,6 +5,7 @@ Serializers for appointment management API
 from rest_framework import serializers
 from .models import (
     DoctorAvailability, 
+    AvailabilityException,
     Appointment, 
     DoctorProfile, 
     ContactInquiry, 
@@ -19,6 +20,7 @@ class DoctorAvailabilitySerializer(serializers.ModelSerializer):
         model = DoctorAvailability
         fields = [
             'availability_id',
+            'doctor',
             'is_recurring',
             'day_of_week',
             'date',
@@ -32,6 +34,40 @@ class DoctorAvailabilitySerializer(serializers.ModelSerializer):
         read_only_fields = ['availability_id', 'created_at', 'updated_at']
 
 
+class AvailabilityExceptionSerializer(serializers.ModelSerializer):
+    """Serializer for blocked dates and hours"""
+    
+    class Meta:
+        model = AvailabilityException
+        fields = [
+            'exception_id',
+            'doctor',
+            'start_date',
+            'end_date',
+            'start_time',
+            'end_time',
+            'reason',
+            'is_active',
+            'created_at',
+            'updated_at'
+        ]
+        read_only_fields = ['exception_id', 'created_at', 'updated_at']
+    
+    def validate(self, data):
+        # Validate against the stored values on partial updates
+        def current(field):
+            if field in data:
+                return data[field]
+            return getattr(self.instance, field, None)
+        
+        if current('end_date') < current('start_date'):
+            raise serializers.ValidationError("End date must not be before start date")
+        start_time, end_time = current('start_time'), current('end_time')
+        if start_time and end_time and start_time >= end_time:
+            raise serializers.ValidationError("End time must be after start time")
+        return data
+
+
 class RecurringAvailabilityCreateSerializer(serializers.Serializer):
     """Serializer for creating recurring availability entries"""
     
@@ -39,6 +75,25 @@ class RecurringAvailabilityCreateSerializer(serializers.Serializer):
         child=serializers.IntegerField(min_value=0, max_value=6),
         allow_empty=False
     )
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    slot_duration = serializers.IntegerField(default=30, min_value=15, max_value=120)
+    doctor = serializers.PrimaryKeyRelatedField(
+        queryset=DoctorProfile.objects.filter(is_active=True),
+        required=False,
+        allow_null=True,
+        default=None
+    )
+    
+    def validate(self, data):
+        if data['start_time'] >= data['end_time']:
+            raise serializers.ValidationError("End time must be after start time")
+        return data
+
+
+class AvailabilityImportEntrySerializer(serializers.Serializer):
+    """Base serializer for one imported availability window"""
+    
     start_time = serializers.TimeField()
     end_time = serializers.TimeField()
     slot_duration = serializers.IntegerField(default=30, min_value=15, max_value=120)
@@ -49,6 +104,38 @@ class RecurringAvailabilityCreateSerializer(serializers.Serializer):
         return data
 
 
+class WeeklyAvailabilityImportSerializer(AvailabilityImportEntrySerializer):
+    """Imported weekly window"""
+    
+    day_of_week = serializers.IntegerField(min_value=0, max_value=6)
+
+
+class DateAvailabilityImportSerializer(AvailabilityImportEntrySerializer):
+    """Imported window for a single date"""
+    
+    date = serializers.DateField()
+
+
+class AvailabilityImportSerializer(serializers.Serializer):
+    """Serializer for importing a weekly schedule and/or dated overrides"""
+    
+    weekly = WeeklyAvailabilityImportSerializer(many=True, required=False)
+    overrides = DateAvailabilityImportSerializer(many=True, required=False)
+    replace_weekly = serializers.BooleanField(default=False)
+    # Doctor every imported entry belongs to; empty for the unassigned schedule
+    doctor = serializers.PrimaryKeyRelatedField(
+        queryset=DoctorProfile.objects.filter(is_active=True),
+        required=False,
+        allow_null=True,
+        default=None
+    )
+    
+    def validate(self, data):
+        if not (data.get('weekly') or data.get('overrides') or data['replace_weekly']):
+            raise serializers.ValidationError("Provide weekly entries, date overrides or both")
+        return data
+
+
 class AvailableSlotsSerializer(serializers.Serializer):
     """Serializer for available time slots"""
     
@@ -56,6 +143,7 @@ class AvailableSlotsSerializer(serializers.Serializer):
     available = serializers.BooleanField()
     slot_id = serializers.CharField(required=False)
     duration = serializers.IntegerField(required=False)
+    doctor_id = serializers.IntegerField(required=False, allow_null=True)
 
 
 class AppointmentSerializer(serializers.ModelSerializer):
@@ -65,6 +153,7 @@ class AppointmentSerializer(serializers.ModelSerializer):
         model = Appointment
         fields = [
             'appointment_id',
+            'doctor',
             'patient_name',
             'patient_email',
             'patient_phone',
@@ -91,8 +180,10 @@ class AppointmentCreateSerializer(serializers.ModelSerializer):
             'appointment_date',
             'appointment_time',
             'reason',
-            'notes'
+            'notes',
+            'doctor'
         ]
+        extra_kwargs = {'doctor': {'queryset': DoctorProfile.objects.filter(is_active=True)}}
     
     def validate_appointment_date(self, value):
         from django.utils import timezone
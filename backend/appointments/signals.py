@@ -0,0 +1,44 @@
+"""
+Signal handlers for appointment management
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Appointment, AvailabilityException, DoctorAvailability, DoctorProfile
+from .utils import bump_appointments_version, bump_slot_date_versions, invalidate_weekly_template
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """Let SQLite readers run alongside a writer and wait on locks instead of failing"""
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=WAL;')
+        cursor.execute('PRAGMA synchronous=NORMAL;')
+        cursor.execute(f'PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT};')
+
+
+@receiver(post_save, sender=DoctorAvailability)
+@receiver(post_delete, sender=DoctorAvailability)
+@receiver(post_save, sender=AvailabilityException)
+@receiver(post_delete, sender=AvailabilityException)
+@receiver(post_save, sender=DoctorProfile)
+@receiver(post_delete, sender=DoctorProfile)
+def availability_changed(sender, instance, **kwargs):
+    """Invalidate the compiled weekly template and cached slots once the change is committed"""
+    transaction.on_commit(invalidate_weekly_template)
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def appointment_changed(sender, instance, **kwargs):
+    """Invalidate cached slots for the appointment's date and the list ETag once the change is committed"""
+    appointment_date = instance.appointment_date
+    transaction.on_commit(lambda: bump_slot_date_versions([appointment_date]))
+    transaction.on_commit(bump_appointments_version)
@@ -0,0 +1,433 @@
+"""
+Tests for appointment management
+"""
+
+from datetime import date, time, timedelta
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .intervals import AvailabilityIndex, IntervalIndex
+from .models import Appointment, AvailabilityException, DoctorAvailability, DoctorProfile
+from .utils import (
+    ACTIVE_APPOINTMENT_STATUSES, availability_index_row, doctor_filter, find_next_available_slots,
+    get_availability_conflicts, get_availability_index, get_cached_available_slots, get_slot_versions,
+)
+
+
+class SlotQueryIndexChecks:
+    """The slot and conflict queries are planned on the indexes declared for them"""
+
+    target_date = date(2030, 1, 7)
+
+    # Indexes the appointment slot lookups may use; PostgreSQL can also
+    # answer them from the partial indexes behind the unique constraints
+    booked_times_indexes = ('appointment_slot_status_idx',)
+    booking_check_indexes = ('appointment_slot_status_idx',)
+
+    def assertPlanUses(self, queryset, *index_names):
+        """Each name, or one name out of each tuple, must appear in the plan"""
+        plan = queryset.explain()
+        for names in index_names:
+            names = (names,) if isinstance(names, str) else names
+            self.assertTrue(any(name in plan for name in names), f'{" or ".join(names)} missing from plan:\n{plan}')
+
+    def test_availability_for_date_uses_weekday_and_date_indexes(self):
+        # get_availability_for_date
+        queryset = DoctorAvailability.objects.filter(
+            Q(is_recurring=True, day_of_week=self.target_date.weekday()) |
+            Q(is_recurring=False, date=self.target_date),
+            is_active=True
+        )
+        self.assertPlanUses(queryset, 'availability_weekday_idx', 'availability_date_idx')
+
+    def test_specific_availability_for_range_uses_date_index(self):
+        # get_specific_availability_for_range
+        queryset = DoctorAvailability.objects.filter(
+            is_recurring=False,
+            date__range=[self.target_date, self.target_date + timedelta(days=6)],
+            is_active=True
+        )
+        self.assertPlanUses(queryset, 'availability_date_idx')
+
+    def test_booked_times_for_range_uses_slot_index(self):
+        # get_booked_times_for_range
+        queryset = Appointment.objects.filter(
+            appointment_date__range=[self.target_date, self.target_date + timedelta(days=6)],
+            status__in=ACTIVE_APPOINTMENT_STATUSES
+        ).values_list('doctor_id', 'appointment_date', 'appointment_time')
+        self.assertPlanUses(queryset, self.booked_times_indexes)
+
+    def test_slot_booking_check_uses_slot_index(self):
+        # get_available_doctors_for_slot
+        queryset = Appointment.objects.filter(
+            doctor_filter([None]),
+            appointment_date=self.target_date,
+            appointment_time=time(9, 0),
+            status__in=ACTIVE_APPOINTMENT_STATUSES
+        ).values_list('doctor_id', flat=True)
+        self.assertPlanUses(queryset, self.booking_check_indexes)
+
+    def test_blocked_windows_use_exception_range_index(self):
+        # get_blocked_windows_for_range
+        queryset = AvailabilityException.objects.filter(
+            start_date__lte=self.target_date,
+            end_date__gte=self.target_date,
+            is_active=True
+        )
+        self.assertPlanUses(queryset, 'exception_range_idx')
+
+    def test_admin_listing_uses_recent_index(self):
+        queryset = Appointment.objects.order_by('-created_at', '-appointment_id')[:20]
+        self.assertPlanUses(queryset, 'appointment_recent_idx')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite query plans')
+class SQLiteSlotQueryIndexTests(SlotQueryIndexChecks, TestCase):
+    pass
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL query plans')
+class PostgreSQLSlotQueryIndexTests(SlotQueryIndexChecks, TestCase):
+    booked_times_indexes = ('appointment_slot_status_idx', 'appointment_active_slot_idx')
+    booking_check_indexes = (
+        'appointment_slot_status_idx', 'appointment_active_slot_idx', 'unique_active_slot_without_doctor'
+    )
+
+    def setUp(self):
+        # The test tables are nearly empty, so make any usable index win over a scan
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+
+@override_settings(SCHEDULE_SHARED_CACHE=False)
+class UnsharedSlotCacheTests(TestCase):
+    """Without a shared cache, slot lists are never served from a stale copy"""
+
+    def test_booking_is_visible_without_version_bump(self):
+        target_date = date.today() + timedelta(days=1)
+        DoctorAvailability.objects.create(
+            is_recurring=False, date=target_date, start_time=time(9, 0), end_time=time(10, 0)
+        )
+        versions = get_slot_versions(target_date)
+        self.assertEqual(versions, (None, None))
+        self.assertEqual(len(get_cached_available_slots(target_date, versions)), 2)
+
+        # Another worker's booking: no signal reaches this process's cache
+        Appointment.objects.bulk_create([Appointment(
+            patient_name='Test', patient_email='test@example.com', patient_phone='9876543210',
+            appointment_date=target_date, appointment_time=time(9, 0), reason='other'
+        )])
+        self.assertEqual(len(get_cached_available_slots(target_date, get_slot_versions(target_date))), 1)
+
+
+@override_settings(SCHEDULE_SHARED_CACHE=False)
+class NextAvailableSlotTests(TestCase):
+    """Next free slot search"""
+
+    def test_empty_schedule_stops_before_walking_windows(self):
+        # Compiling the template plus one check for date overrides
+        with self.assertNumQueries(3):
+            self.assertEqual(find_next_available_slots(5), [])
+
+    def test_date_override_is_found(self):
+        target_date = date.today() + timedelta(days=20)
+        DoctorAvailability.objects.create(
+            is_recurring=False, date=target_date, start_time=time(9, 0), end_time=time(10, 0)
+        )
+        slots = find_next_available_slots(5)
+        self.assertEqual([slot['date'] for slot in slots], [target_date.strftime('%Y-%m-%d')] * 2)
+
+
+def index_row(day_of_week=None, on_date=None, start=(9, 0), end=(10, 0), doctor_id=None):
+    return availability_index_row({
+        'doctor_id': doctor_id,
+        'is_recurring': on_date is None,
+        'day_of_week': day_of_week,
+        'date': on_date,
+        'start_time': time(*start),
+        'end_time': time(*end),
+    })
+
+
+class IntervalIndexTests(TestCase):
+    """Half-open interval lookups"""
+
+    def setUp(self):
+        self.index = IntervalIndex([(540, 600, 'a'), (570, 660, 'b'), (720, 780, 'c')])
+
+    def test_touching_intervals_do_not_overlap(self):
+        self.assertFalse(self.index.overlaps(660, 720))
+        self.assertFalse(self.index.overlaps(480, 540))
+        self.assertTrue(self.index.overlaps(659, 720))
+
+    def test_overlapping_lists_every_match(self):
+        self.assertEqual(self.index.overlapping(590, 730), ['a', 'b', 'c'])
+        self.assertEqual(self.index.overlapping(600, 660), ['b'])
+
+    def test_overlapping_pairs(self):
+        self.assertEqual(self.index.overlapping_pairs(), [('a', 'b')])
+
+
+class AvailabilityIndexTests(TestCase):
+    """Recurring and dated availability overlap checks"""
+
+    monday = date(2030, 1, 7)
+
+    def test_dated_entry_is_checked_against_its_weekday_rule(self):
+        index = AvailabilityIndex([index_row(day_of_week=0, start=(9, 0), end=(12, 0))])
+        self.assertTrue(index.overlaps(index_row(on_date=self.monday, start=(11, 0), end=(13, 0))))
+        self.assertFalse(index.overlaps(index_row(on_date=self.monday + timedelta(days=1))))
+        self.assertFalse(index.overlaps(
+            index_row(on_date=self.monday, start=(11, 0), end=(13, 0)), include_recurring=False
+        ))
+
+    def test_doctors_never_conflict(self):
+        index = AvailabilityIndex([index_row(day_of_week=0, doctor_id=1)])
+        self.assertFalse(index.overlaps(index_row(day_of_week=0, doctor_id=2)))
+        self.assertTrue(index.overlaps(index_row(day_of_week=0, doctor_id=1)))
+
+    def test_weekly_rule_skips_dated_entries_before_dated_from(self):
+        index = AvailabilityIndex([index_row(on_date=self.monday)])
+        rule = index_row(day_of_week=0)
+        self.assertTrue(index.overlaps(rule))
+        self.assertTrue(index.overlaps(rule, dated_from=self.monday))
+        self.assertFalse(index.overlaps(rule, dated_from=self.monday + timedelta(days=1)))
+
+    def test_overlapping_pairs_from_start_date(self):
+        rule = index_row(day_of_week=0, start=(9, 0), end=(12, 0))
+        override = index_row(on_date=self.monday)
+        index = AvailabilityIndex([rule, override])
+        self.assertEqual(index.overlapping_pairs(), [(override, rule)])
+        self.assertEqual(index.overlapping_pairs(start_date=self.monday + timedelta(days=1)), [])
+
+
+class AvailabilityConflictTests(TestCase):
+    """Conflict checks for new availability entries"""
+
+    def test_past_override_does_not_block_weekly_rule(self):
+        past_date = date.today() - timedelta(days=7)
+        DoctorAvailability.objects.create(
+            is_recurring=False, date=past_date, start_time=time(9, 0), end_time=time(10, 0)
+        )
+        weekly_rule = {
+            'is_recurring': True, 'day_of_week': past_date.weekday(),
+            'start_time': time(9, 0), 'end_time': time(12, 0),
+        }
+        self.assertEqual(get_availability_conflicts(weekly_rule), [])
+
+        DoctorAvailability.objects.create(
+            is_recurring=False, date=past_date + timedelta(days=14), start_time=time(9, 0), end_time=time(10, 0)
+        )
+        self.assertEqual(len(get_availability_conflicts(weekly_rule)), 1)
+
+    @override_settings(SCHEDULE_SHARED_CACHE=False)
+    def test_unshared_index_skips_past_dated_entries(self):
+        past_date = date.today() - timedelta(days=7)
+        DoctorAvailability.objects.create(
+            is_recurring=False, date=past_date, start_time=time(9, 0), end_time=time(10, 0)
+        )
+        self.assertEqual(get_availability_index(dated_from=date.today()).dated, {})
+        self.assertEqual(len(get_availability_index(dated_from=past_date).dated), 1)
+
+
+class DoctorAvailabilityDetailTests(TestCase):
+    """Admin edits of dated availability"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', 'admin@example.com', 'pw', is_staff=True))
+        self.target_date = date.today() + timedelta(days=3)
+        self.availability = DoctorAvailability.objects.create(
+            is_recurring=False, date=self.target_date, start_time=time(9, 0), end_time=time(10, 0)
+        )
+        self.url = reverse('appointments:doctor_availability_detail', args=[self.availability.availability_id])
+
+    def book(self):
+        Appointment.objects.create(
+            patient_name='Test', patient_email='test@example.com', patient_phone='9876543210',
+            appointment_date=self.target_date, appointment_time=time(9, 0), reason='other'
+        )
+
+    def test_update_and_delete_without_bookings(self):
+        response = self.client.put(self.url, {'end_time': '11:00'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.delete(self.url).status_code, 200)
+
+    def test_booked_date_cannot_be_changed(self):
+        self.book()
+        self.assertEqual(self.client.put(self.url, {'end_time': '11:00'}, format='json').status_code, 400)
+        self.assertEqual(self.client.delete(self.url).status_code, 400)
+
+
+class AvailabilityExceptionDetailTests(TestCase):
+    """Admin availability exception detail endpoint"""
+
+    def test_malformed_id_is_404(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('admin', 'admin@example.com', 'pw', is_staff=True))
+        response = client.get('/api/availability/exceptions/not-a-uuid/')
+        self.assertEqual(response.status_code, 404)
+
+
+def make_appointment(appointment_date, appointment_time=time(9, 0), **fields):
+    return Appointment.objects.create(
+        patient_name='Test', patient_email='test@example.com', patient_phone='9876543210',
+        appointment_date=appointment_date, appointment_time=appointment_time, reason='other', **fields
+    )
+
+
+def make_doctor(name):
+    return DoctorProfile.objects.create(
+        name=name, title='Consultant', specialization='Surgery', experience_years=10,
+        qualifications='MS', bio='', email=f'{name.lower()}@example.com', phone='9876543210', address=''
+    )
+
+
+class BookAppointmentTests(TestCase):
+    """Public booking endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.target_date = date.today() + timedelta(days=1)
+        DoctorAvailability.objects.create(
+            is_recurring=False, date=self.target_date, start_time=time(9, 0), end_time=time(10, 0)
+        )
+        self.url = reverse('appointments:book_appointment')
+        self.payload = {
+            'patient_name': 'Test',
+            'patient_email': 'test@example.com',
+            'patient_phone': '9876543210',
+            'appointment_date': self.target_date.isoformat(),
+            'appointment_time': '09:00',
+            'reason': 'other',
+        }
+
+    def book(self):
+        return self.client.post(self.url, self.payload, format='json')
+
+    def test_booked_slot_is_no_longer_offered(self):
+        self.assertEqual(self.book().status_code, 201)
+        self.assertEqual(self.book().status_code, 400)
+
+    def test_lost_race_returns_409(self):
+        make_appointment(self.target_date)
+        # Both requests saw the slot free; the database rejects the second
+        with mock.patch('appointments.views.get_available_doctors_for_slot', return_value=[None]):
+            response = self.book()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_cancelled_and_completed_bookings_free_the_slot(self):
+        for final_status in ('cancelled', 'completed'):
+            response = self.book()
+            self.assertEqual(response.status_code, 201)
+            Appointment.objects.filter(
+                appointment_id=response.json()['appointment']['appointment_id']
+            ).update(status=final_status)
+        self.assertEqual(self.book().status_code, 201)
+
+
+class ActiveSlotConstraintTests(TestCase):
+    """One active booking per doctor and slot, NULL doctor included"""
+
+    def setUp(self):
+        self.target_date = date.today() + timedelta(days=1)
+
+    def assertRejected(self, **fields):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            make_appointment(self.target_date, **fields)
+
+    def test_unassigned_slot_takes_one_active_booking(self):
+        make_appointment(self.target_date)
+        self.assertRejected()
+        self.assertRejected(status='confirmed')
+        make_appointment(self.target_date, status='cancelled')
+        make_appointment(self.target_date, status='completed')
+
+    def test_doctors_have_their_own_slots(self):
+        first, second = make_doctor('First'), make_doctor('Second')
+        make_appointment(self.target_date, doctor=first)
+        make_appointment(self.target_date, doctor=second)
+        make_appointment(self.target_date)
+        self.assertRejected(doctor=first)
+
+
+class AppointmentListETagTests(TestCase):
+    """Admin appointment list revalidation"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', 'admin@example.com', 'pw', is_staff=True))
+        self.url = reverse('appointments:appointments') + '?cursor=&with_count=0'
+
+    def book(self, appointment_time=time(9, 0)):
+        with self.captureOnCommitCallbacks(execute=True):
+            Appointment.objects.create(
+                patient_name='Test', patient_email='test@example.com', patient_phone='9876543210',
+                appointment_date=date.today() + timedelta(days=1), appointment_time=appointment_time,
+                reason='other'
+            )
+
+    @override_settings(SCHEDULE_SHARED_CACHE=True)
+    def test_change_counter_validates_the_list(self):
+        self.book()
+        etag = self.client.get(self.url)['ETag']
+        # The validator needs no query against the appointments table
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.book(time(9, 30))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['appointments']), 2)
+
+    @override_settings(SCHEDULE_SHARED_CACHE=False)
+    def test_no_etag_without_shared_cache(self):
+        self.book()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+
+class ServerTimingTests(TestCase):
+    """Request timings are only shown to staff"""
+
+    def test_header_only_for_staff(self):
+        client = APIClient()
+        url = reverse('appointments:available_slots')
+        self.assertNotIn('Server-Timing', client.get(url))
+
+        client.force_authenticate(User.objects.create_user('admin', 'admin@example.com', 'pw', is_staff=True))
+        self.assertIn('Server-Timing', client.get(url))
+
+
+class AppointmentDetailTests(TestCase):
+    """Admin appointment detail endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', 'admin@example.com', 'pw', is_staff=True))
+        self.appointment = Appointment.objects.create(
+            patient_name='Test', patient_email='test@example.com', patient_phone='9876543210',
+            appointment_date=date.today() + timedelta(days=1), appointment_time=time(9, 0), reason='other'
+        )
+        self.url = reverse('appointments:appointment_detail', args=[self.appointment.appointment_id])
+
+    def test_get_revalidates_with_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['appointment']['id'], str(self.appointment.appointment_id))
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_appointment_is_404(self):
+        url = reverse('appointments:appointment_detail', args=['00000000-0000-0000-0000-000000000000'])
+        self.assertEqual(self.client.get(url).status_code, 404)
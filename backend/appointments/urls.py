@@ -10,14 +10,16 @@ app_name = 'appointments'
 urlpatterns = [
     # Main appointment endpoints
     path('appointments/', views.AppointmentCreateView.as_view(), name='appointments'),
-    path('appointments/<int:appointment_id>/', views.appointment_detail_view, name='appointment_detail'),
+    path('appointments/book/', views.book_appointment, name='book_appointment'),  # Public endpoint for patients
+    path('appointments/bulk-status/', views.bulk_update_appointment_status, name='bulk_appointment_status'),
+    path('appointments/<uuid:appointment_id>/', views.appointment_detail_view, name='appointment_detail'),
     
     # Admin action endpoints (for email buttons)
-    path('appointments/<int:appointment_id>/confirm/', views.confirm_appointment, name='confirm_appointment'),
-    path('appointments/<int:appointment_id>/cancel/', views.cancel_appointment, name='cancel_appointment'),
+    path('appointments/<uuid:appointment_id>/confirm/', views.confirm_appointment, name='confirm_appointment'),
+    path('appointments/<uuid:appointment_id>/cancel/', views.cancel_appointment, name='cancel_appointment'),
     
     # Admin email action endpoints (new)
-    path('admin/appointments/<int:appointment_id>/<str:action>/', views.admin_appointment_action, name='admin_appointment_action'),
+    path('admin/appointments/<uuid:appointment_id>/<str:action>/', views.admin_appointment_action, name='admin_appointment_action'),
     
     # Invisible action page for email buttons
     path('appointment-action/', views.appointment_action_page, name='appointment_action_page'),
@@ -27,9 +29,17 @@ urlpatterns = [
     
     # Doctor availability management endpoints (admin only)
     path('availability/', views.DoctorAvailabilityView.as_view(), name='doctor_availability'),
+    path('availability/exceptions/', views.AvailabilityExceptionView.as_view(), name='availability_exceptions'),
+    path('availability/exceptions/<uuid:exception_id>/', views.AvailabilityExceptionView.as_view(), name='availability_exception_detail'),
+    path('availability/lint/', views.lint_schedule, name='schedule_lint'),
+    path('availability/import/', views.AvailabilityImportView.as_view(), name='availability_import'),
     path('availability/<str:availability_id>/', views.DoctorAvailabilityView.as_view(), name='doctor_availability_detail'),
     
     # Available slots endpoints
     path('available-slots/', views.get_available_slots, name='available_slots'),  # Public endpoint for patients
+    path('next-available/', views.get_next_available_slots, name='next_available_slots'),  # Public endpoint for patients
     path('slots/detailed/', views.get_detailed_slots, name='detailed_slots'),  # Admin endpoint with full slot info
+    
+    # Request metrics endpoint (admin only)
+    path('metrics/requests/', views.get_request_metrics, name='request_metrics'),
 ]
@@ -2,85 +2,331 @@
 Utility functions for appointment management
 """
 
+from bisect import bisect_left
 from datetime import datetime, date, time, timedelta
-from django.db.models import Q
-from .models import DoctorAvailability, Appointment
+import base64
+import binascii
+import json
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.db.models.functions import TruncDay, TruncWeek
+from .intervals import AvailabilityIndex
+from .models import DoctorAvailability, AvailabilityException, Appointment, DoctorProfile, EmailOutbox
 
 
-def get_availability_for_date(target_date):
-    """Get all availability entries for a specific date"""
-    # Get recurring availability for the day of week
-    day_of_week = target_date.weekday()
-    recurring_availability = DoctorAvailability.objects.filter(
-        is_recurring=True,
-        day_of_week=day_of_week,
+ACTIVE_APPOINTMENT_STATUSES = ['pending', 'confirmed']
+APPOINTMENT_STATUSES = [status for status, _ in Appointment.STATUS_CHOICES]
+
+# Period functions for bucketed appointment statistics
+STATISTICS_BUCKETS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+}
+
+# Longest date range served by the calendar endpoints
+MAX_CALENDAR_DAYS = 90
+
+# Days of slots built per batch of queries by the next-available search
+NEXT_AVAILABLE_WINDOW_DAYS = 7
+
+# Most slots returned by one next-available search
+MAX_NEXT_AVAILABLE_SLOTS = 50
+
+MINUTES_PER_DAY = 24 * 60
+
+# Cache keys for the compiled weekly availability template
+AVAILABILITY_VERSION_CACHE_KEY = 'appointments:availability_version'
+WEEKLY_TEMPLATE_CACHE_KEY = 'appointments:weekly_template:v3'
+
+# Cache keys for the public available-slots responses
+SLOT_DATE_VERSION_CACHE_KEY = 'appointments:slot_version:{date}'
+AVAILABLE_SLOTS_CACHE_KEY = 'appointments:available_slots:{date}:{doctors}:{availability_version}:{date_version}'
+AVAILABLE_SLOTS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Cache key for the change counter of the appointments table
+APPOINTMENTS_VERSION_CACHE_KEY = 'appointments:appointments_version'
+
+# Per-process copy of the compiled templates and the version they were built at
+_weekly_template = {'version': None, 'template': None}
+
+# Weekday -> slot entries for a doctor without recurring availability
+EMPTY_WEEK = {weekday: () for weekday, _ in DoctorAvailability.DAY_CHOICES}
+
+# Per-process overlap index over active availability, rebuilt on version change
+_availability_index = {'version': None, 'index': None}
+
+
+def doctor_filter(doctor_ids, field='doctor'):
+    """Filter rows belonging to any of the given doctors; None stands for the unassigned schedule"""
+    assigned = [doctor_id for doctor_id in doctor_ids if doctor_id is not None]
+    query = Q(**{f'{field}__in': assigned})
+    if None in doctor_ids:
+        query |= Q(**{f'{field}__isnull': True})
+    return query
+
+
+def get_doctor_partitions():
+    """Doctors whose schedules are served: None (unassigned) first, then active doctors"""
+    return list(get_weekly_templates())
+
+
+def resolve_doctor_ids(doctor_ids=None, templates=None):
+    """All served doctors when doctor_ids is None, otherwise the given ones that are still served"""
+    partitions = list(templates) if templates is not None else get_doctor_partitions()
+    if doctor_ids is None:
+        return partitions
+    return [doctor_id for doctor_id in doctor_ids if doctor_id in partitions]
+
+
+def get_availability_for_date(target_date, doctor_ids=None):
+    """Get all availability entries for a specific date, optionally for some doctors only"""
+    # Recurring availability for the day of week plus specific date
+    # availability, fetched together in a single query
+    availability = DoctorAvailability.objects.filter(
+        Q(is_recurring=True, day_of_week=target_date.weekday()) |
+        Q(is_recurring=False, date=target_date),
         is_active=True
     )
-    
-    # Get specific date availability
-    specific_availability = DoctorAvailability.objects.filter(
+    if doctor_ids is not None:
+        availability = availability.filter(doctor_filter(doctor_ids))
+
+    # Recurring entries first, then specific date entries
+    return sorted(availability, key=lambda avail: not avail.is_recurring)
+
+
+def get_specific_availability_for_range(start_date, end_date, doctor_ids):
+    """Get specific (non-recurring) availability entries for a range, keyed by (doctor_id, date)"""
+    specific_by_date = {}
+    # Doctors are filtered here rather than in SQL so the date index stays usable
+    doctor_ids = set(doctor_ids)
+    availability = DoctorAvailability.objects.filter(
         is_recurring=False,
-        date=target_date,
+        date__range=[start_date, end_date],
         is_active=True
     )
-    
-    # Combine and return
-    return list(recurring_availability) + list(specific_availability)
-
-
-def get_available_slots_for_date(target_date):
-    """Get all slots (available and booked) for a specific date"""
-    availability = get_availability_for_date(target_date)
-    slots_data = {
-        'slots': [],
-        'total_slots': 0,
-        'available_slots': 0,
-        'booked_slots': 0,
-        'blocked_slots': 0
-    }
-    
+
     for avail in availability:
-        # Generate time slots for this availability
-        time_slots = generate_time_slots(
-            avail.start_time,
-            avail.end_time,
-            avail.slot_duration
+        if avail.doctor_id not in doctor_ids:
+            continue
+        specific_by_date.setdefault((avail.doctor_id, avail.date), []).append(avail)
+
+    return specific_by_date
+
+
+def get_booked_times_for_range(start_date, end_date, doctor_ids):
+    """Get booked (pending/confirmed) appointment minutes for a range, keyed by (doctor_id, date)"""
+    booked_times = {}
+    # Doctors are filtered here rather than in SQL so the slot index stays usable
+    doctor_ids = set(doctor_ids)
+    bookings = Appointment.objects.filter(
+        appointment_date__range=[start_date, end_date],
+        status__in=ACTIVE_APPOINTMENT_STATUSES
+    ).values_list('doctor_id', 'appointment_date', 'appointment_time')
+
+    for doctor_id, appointment_date, appointment_time in bookings:
+        if doctor_id not in doctor_ids:
+            continue
+        booked_times.setdefault((doctor_id, appointment_date), set()).add(time_to_minutes(appointment_time))
+
+    return booked_times
+
+
+def get_blocked_windows_for_range(start_date, end_date, doctor_ids):
+    """
+    Get merged blocked (start, end) minute windows for a range, keyed by
+    (doctor_id, date), in one query. Practice-wide exceptions apply to
+    every doctor.
+    """
+    windows_by_date = {}
+    exceptions = AvailabilityException.objects.filter(
+        doctor_filter(doctor_ids) | Q(doctor__isnull=True),
+        start_date__lte=end_date,
+        end_date__gte=start_date,
+        is_active=True
+    ).values_list('doctor_id', 'start_date', 'end_date', 'start_time', 'end_time')
+
+    for exception_doctor_id, exception_start, exception_end, start_time, end_time in exceptions:
+        # A missing bound extends the window to that end of the day
+        window = (
+            time_to_minutes(start_time) if start_time else 0,
+            time_to_minutes(end_time) if end_time else MINUTES_PER_DAY
         )
-        
-        for slot_time in time_slots:
-            slot_id = f"{avail.availability_id}_{slot_time.strftime('%H%M')}"
-            
-            # Check if slot is booked
-            is_booked = Appointment.objects.filter(
-                appointment_date=target_date,
-                appointment_time=slot_time,
-                status__in=['pending', 'confirmed']
-            ).exists()
-            
-            slot_data = {
-                'time': slot_time.strftime('%H:%M'),
-                'available': not is_booked,
-                'slot_id': slot_id,
-                'duration': avail.slot_duration,
-                'booked': is_booked
-            }
-            
-            slots_data['slots'].append(slot_data)
-            slots_data['total_slots'] += 1
-            
-            if is_booked:
-                slots_data['booked_slots'] += 1
-            else:
-                slots_data['available_slots'] += 1
-    
-    return slots_data
-
-
-def get_only_available_slots_for_date(target_date):
-    """Get only available slots for a specific date (excludes booked slots)"""
-    availability = get_availability_for_date(target_date)
-    available_slots = []
-    
+        blocked_doctors = doctor_ids if exception_doctor_id is None else [exception_doctor_id]
+        for blocked_date in iter_dates(max(exception_start, start_date), min(exception_end, end_date)):
+            for doctor_id in blocked_doctors:
+                windows_by_date.setdefault((doctor_id, blocked_date), []).append(window)
+
+    return {key: merge_windows(windows) for key, windows in windows_by_date.items()}
+
+
+def merge_windows(windows):
+    """Merge overlapping or touching (start, end) windows into a sorted, disjoint list"""
+    merged = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def is_slot_blocked(slot_minutes, duration, blocked_windows, window_starts=None):
+    """Check whether a slot overlaps any of a date's merged blocked windows"""
+    if not blocked_windows:
+        return False
+    if window_starts is None:
+        window_starts = [start for start, _ in blocked_windows]
+
+    # Only the last window starting before the slot ends can still overlap it
+    index = bisect_left(window_starts, slot_minutes + duration) - 1
+    return index >= 0 and blocked_windows[index][1] > slot_minutes
+
+
+def iter_dates(start_date, end_date):
+    """Yield every date from start_date to end_date inclusive"""
+    current_date = start_date
+    while current_date <= end_date:
+        yield current_date
+        current_date += timedelta(days=1)
+
+
+def _get_version(key):
+    """Get a shared version stamp from the cache, or None without a shared cache"""
+    if not settings.SCHEDULE_SHARED_CACHE:
+        return None
+
+    version = cache.get(key)
+    if version is None:
+        # Seed with a timestamp so an evicted counter never reuses an old value
+        cache.add(key, int(datetime.now().timestamp() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    """Advance a version stamp so everything cached under the old one is ignored"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(datetime.now().timestamp() * 1000), timeout=None)
+
+
+def get_availability_version():
+    """Get the shared version stamp of the availability schedule, or None without a shared cache"""
+    return _get_version(AVAILABILITY_VERSION_CACHE_KEY)
+
+
+def get_slot_date_version(target_date):
+    """Get the shared version stamp of the bookings on a date, or None without a shared cache"""
+    return _get_version(SLOT_DATE_VERSION_CACHE_KEY.format(date=target_date.isoformat()))
+
+
+def bump_slot_date_versions(dates):
+    """Invalidate cached slot responses for the given dates"""
+    for target_date in set(dates):
+        _bump_version(SLOT_DATE_VERSION_CACHE_KEY.format(date=target_date.isoformat()))
+
+
+def get_appointments_version():
+    """Get the shared change counter of the appointments table, or None without a shared cache"""
+    return _get_version(APPOINTMENTS_VERSION_CACHE_KEY)
+
+
+def bump_appointments_version():
+    """Invalidate validators built from the appointments table"""
+    _bump_version(APPOINTMENTS_VERSION_CACHE_KEY)
+
+
+def get_slot_versions(target_date):
+    """Get (availability version, date version) validators for a date's slots"""
+    return get_availability_version(), get_slot_date_version(target_date)
+
+
+def get_cached_available_slots(target_date, versions, doctor_ids=None):
+    """Get the public available-slots payload for a date, cached under its versions"""
+    availability_version, date_version = versions
+    if availability_version is None or date_version is None:
+        # Without shared versions another worker's booking couldn't invalidate the copy
+        return get_only_available_slots_for_date(target_date, doctor_ids)
+
+    key = AVAILABLE_SLOTS_CACHE_KEY.format(
+        date=target_date.isoformat(),
+        doctors='all' if doctor_ids is None else '-'.join(str(doctor_id) for doctor_id in doctor_ids),
+        availability_version=availability_version,
+        date_version=date_version
+    )
+
+    available_slots = cache.get(key)
+    if available_slots is None:
+        available_slots = get_only_available_slots_for_date(target_date, doctor_ids)
+        cache.set(key, available_slots, timeout=AVAILABLE_SLOTS_CACHE_TIMEOUT)
+
+    return available_slots
+
+
+def invalidate_weekly_template():
+    """Discard the compiled weekly template in this and every other process"""
+    _weekly_template.update(version=None, template=None)
+    _availability_index.update(version=None, index=None)
+    _bump_version(AVAILABILITY_VERSION_CACHE_KEY)
+
+
+def compile_weekly_template():
+    """Compile recurring availability into doctor -> weekday -> sorted tuple of slot entries"""
+    doctor_ids = [None] + list(
+        DoctorProfile.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True)
+    )
+    templates = {
+        doctor_id: {weekday: [] for weekday, _ in DoctorAvailability.DAY_CHOICES}
+        for doctor_id in doctor_ids
+    }
+    recurring_availability = DoctorAvailability.objects.filter(is_recurring=True, is_active=True)
+
+    for avail in recurring_availability:
+        # Rules of inactive doctors are not served
+        if avail.doctor_id in templates:
+            templates[avail.doctor_id][avail.day_of_week].extend(expand_availability([avail]))
+
+    return {
+        doctor_id: {weekday: tuple(sorted(entries)) for weekday, entries in template.items()}
+        for doctor_id, template in templates.items()
+    }
+
+
+def get_weekly_templates():
+    """Get the compiled weekly templates of every served doctor, recompiling only when the schedule changed"""
+    version = get_availability_version()
+    if version is None:
+        # No shared version to validate a stored copy against
+        return compile_weekly_template()
+    if _weekly_template['version'] == version:
+        return _weekly_template['template']
+
+    cached = cache.get(WEEKLY_TEMPLATE_CACHE_KEY)
+    if cached is not None and cached[0] == version:
+        templates = cached[1]
+    else:
+        templates = compile_weekly_template()
+        cache.set(WEEKLY_TEMPLATE_CACHE_KEY, (version, templates), timeout=None)
+
+    _weekly_template.update(version=version, template=templates)
+    return templates
+
+
+def get_weekly_template(doctor_id=None):
+    """Get one doctor's compiled weekly template (the unassigned schedule by default)"""
+    return get_weekly_templates().get(doctor_id, EMPTY_WEEK)
+
+
+def expand_availability(availability):
+    """Expand availability entries into (slot_minutes, duration, availability_id) tuples"""
+    entries = []
+
     for avail in availability:
         # Generate time slots for this availability
         time_slots = generate_time_slots(
@@ -88,123 +334,689 @@ def get_only_available_slots_for_date(target_date):
             avail.end_time,
             avail.slot_duration
         )
-        
-        for slot_time in time_slots:
-            # Check if slot is booked
-            is_booked = Appointment.objects.filter(
-                appointment_date=target_date,
-                appointment_time=slot_time,
-                status__in=['pending', 'confirmed']
-            ).exists()
-            
-            if not is_booked:
-                available_slots.append({
-                    'time': slot_time.strftime('%H:%M'),
-                    'available': True,
-                    'slot_id': f"{avail.availability_id}_{slot_time.strftime('%H%M')}",
-                    'duration': avail.slot_duration
-                })
-    
-    return available_slots
+        entries.extend(
+            (slot_minutes, avail.slot_duration, str(avail.availability_id))
+            for slot_minutes in time_slots
+        )
 
+    return entries
 
-def generate_time_slots(start_time, end_time, duration_minutes):
-    """Generate time slots between start and end time"""
+
+def build_slots(slot_entries, booked_times, blocked_windows=(), doctor_id=None):
+    """Merge slot entries with booked minutes and blocked windows, formatting times as HH:MM"""
     slots = []
-    current_time = datetime.combine(date.today(), start_time)
-    end_datetime = datetime.combine(date.today(), end_time)
-    
-    while current_time < end_datetime:
-        slots.append(current_time.time())
-        current_time += timedelta(minutes=duration_minutes)
-    
+    window_starts = [start for start, _ in blocked_windows]
+
+    for slot_minutes, duration, availability_id in slot_entries:
+        is_booked = slot_minutes in booked_times
+        is_blocked = is_slot_blocked(slot_minutes, duration, blocked_windows, window_starts)
+        slot_time = format_minutes(slot_minutes)
+        slots.append({
+            'time': slot_time,
+            'available': not (is_booked or is_blocked),
+            'slot_id': f"{availability_id}_{slot_time.replace(':', '')}",
+            'duration': duration,
+            'doctor_id': doctor_id,
+            'booked': is_booked,
+            'blocked': is_blocked
+        })
+
     return slots
 
 
+def build_slots_for_range(start_date, end_date, doctor_ids=None):
+    """
+    Build every doctor's slots for each date in a range, keyed by date and
+    ordered by time. Three grouped queries cover all doctors and dates.
+    """
+    templates = get_weekly_templates()
+    doctor_ids = resolve_doctor_ids(doctor_ids, templates)
+    specific_by_date = get_specific_availability_for_range(start_date, end_date, doctor_ids)
+    booked_by_date = get_booked_times_for_range(start_date, end_date, doctor_ids)
+    blocked_by_date = get_blocked_windows_for_range(start_date, end_date, doctor_ids)
+
+    slots_by_date = {}
+    for current_date in iter_dates(start_date, end_date):
+        day_slots = []
+        for doctor_id in doctor_ids:
+            key = (doctor_id, current_date)
+            slot_entries = (
+                list(templates[doctor_id][current_date.weekday()]) +
+                expand_availability(specific_by_date.get(key, []))
+            )
+            if slot_entries:
+                day_slots.extend(build_slots(
+                    slot_entries,
+                    booked_by_date.get(key, set()),
+                    blocked_by_date.get(key, []),
+                    doctor_id=doctor_id
+                ))
+        # Stable sort keeps each doctor's own order for equal times
+        day_slots.sort(key=lambda slot: slot['time'])
+        slots_by_date[current_date] = day_slots
+
+    return slots_by_date
+
+
+def get_available_slots_for_date(target_date, doctor_ids=None):
+    """Get all slots (available, booked and blocked) for a specific date"""
+    slots = build_slots_for_range(target_date, target_date, doctor_ids)[target_date]
+    booked_slots = sum(1 for slot in slots if slot['booked'])
+    # Booked slots inside a block still count as booked
+    blocked_slots = sum(1 for slot in slots if slot['blocked'] and not slot['booked'])
+
+    return {
+        'slots': slots,
+        'total_slots': len(slots),
+        'available_slots': len(slots) - booked_slots - blocked_slots,
+        'booked_slots': booked_slots,
+        'blocked_slots': blocked_slots
+    }
+
+
+def get_only_available_slots_for_date(target_date, doctor_ids=None):
+    """Get only available slots for a specific date (excludes booked and blocked slots)"""
+    return only_available_slots(build_slots_for_range(target_date, target_date, doctor_ids)[target_date])
+
+
+def get_available_slots_for_range(start_date, end_date, doctor_ids=None):
+    """Get available slots for every date in a range using three queries in total"""
+    now = timezone.localtime().replace(tzinfo=None)
+    days = []
+    for current_date, slots in build_slots_for_range(start_date, end_date, doctor_ids).items():
+        # Slots that have already started today can't be booked
+        available_slots = slots_starting_from(only_available_slots(slots), current_date, now)
+        days.append({
+            'date': current_date.strftime('%Y-%m-%d'),
+            'available_slots': available_slots,
+            'total_available': len(available_slots)
+        })
+
+    return days
+
+
+def slots_starting_from(slots, slot_date, moment):
+    """Drop a date's slots that start before a naive local datetime"""
+    if slot_date < moment.date():
+        return []
+    if slot_date > moment.date():
+        return slots
+
+    # HH:MM strings sort like the times they hold
+    start_time = moment.strftime('%H:%M')
+    return [slot for slot in slots if slot['time'] >= start_time]
+
+
+def only_available_slots(slots):
+    """Strip unavailable slots and booking flags from a list of built slots"""
+    return [
+        {
+            'time': slot['time'],
+            'available': True,
+            'slot_id': slot['slot_id'],
+            'duration': slot['duration'],
+            'doctor_id': slot['doctor_id']
+        }
+        for slot in slots if slot['available']
+    ]
+
+
+def generate_time_slots(start_time, end_time, duration_minutes):
+    """Generate slot start times between start and end time as minutes since midnight"""
+    return range(time_to_minutes(start_time), time_to_minutes(end_time), duration_minutes)
+
+
+def is_slot_in_window(minutes, start_time, end_time, duration_minutes):
+    """Check whether a slot starts at the given minute of a window without building it"""
+    start = time_to_minutes(start_time)
+    return start <= minutes < time_to_minutes(end_time) and (minutes - start) % duration_minutes == 0
+
+
+def time_to_minutes(value):
+    """Convert a time to minutes since midnight"""
+    return value.hour * 60 + value.minute
+
+
+def minutes_to_time(minutes):
+    """Convert minutes since midnight to a time"""
+    return time(minutes // 60, minutes % 60)
+
+
+def format_minutes(minutes):
+    """Format minutes since midnight as HH:MM"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def availability_interval(entry):
+    """An availability entry's [start, end) in minutes since midnight"""
+    return time_to_minutes(entry['start_time']), time_to_minutes(entry['end_time'])
+
+
+def get_entry_doctor_id(entry):
+    """Doctor id of a values() row (doctor_id) or of validated data (doctor instance)"""
+    if 'doctor_id' in entry:
+        return entry['doctor_id']
+    doctor = entry.get('doctor')
+    return doctor.pk if doctor else None
+
+
+def availability_index_row(entry, **extra):
+    """Shape an availability row or entry for AvailabilityIndex"""
+    start, end = availability_interval(entry)
+    return {
+        'availability_id': str(entry['availability_id']) if entry.get('availability_id') else None,
+        'doctor_id': get_entry_doctor_id(entry),
+        'is_recurring': entry.get('is_recurring', False),
+        'day_of_week': entry.get('day_of_week'),
+        'date': entry.get('date'),
+        'start_time': entry['start_time'],
+        'end_time': entry['end_time'],
+        'start': start,
+        'end': end,
+        **extra,
+    }
+
+
+def get_availability_index(dated_from=None):
+    """
+    Get the overlap index of active availability, rebuilding it only when
+    the schedule changed. Without a shared cache the index is built for
+    each call, so dated_from skips dated entries before that day.
+    """
+    version = get_availability_version()
+    if version is not None and _availability_index['version'] == version:
+        return _availability_index['index']
+
+    rows = DoctorAvailability.objects.filter(is_active=True)
+    if version is None and dated_from is not None:
+        rows = rows.filter(Q(is_recurring=True) | Q(date__gte=dated_from))
+    rows = rows.values(
+        'availability_id', 'doctor_id', 'is_recurring', 'day_of_week', 'date', 'start_time', 'end_time'
+    )
+    index = AvailabilityIndex(availability_index_row(row) for row in rows)
+    if version is not None:
+        _availability_index.update(version=version, index=index)
+    return index
+
+
+def _earliest_checked_date(rows):
+    """Today, or the earliest date of the dated rows being checked if that is before today"""
+    return min([date.today()] + [row['date'] for row in rows if not row['is_recurring'] and row['date']])
+
+
+def get_availability_conflicts(availability_data, exclude_id=None):
+    """Get active availability rows overlapping an entry, including recurring vs dated overlaps"""
+    if not availability_data.get('is_recurring', False) and not availability_data.get('date'):
+        return []  # No date specified for non-recurring
+
+    entry_row = availability_index_row(availability_data)
+    index = get_availability_index(dated_from=_earliest_checked_date([entry_row]))
+    # Weekly rules only apply from today, so past overrides can't clash with them
+    today = date.today()
+    if exclude_id is None:
+        # Cheap yes/no before listing anything
+        if not index.overlaps(entry_row, dated_from=today):
+            return []
+    return [
+        row for row in index.overlapping(entry_row, dated_from=today)
+        if row['availability_id'] != str(exclude_id)
+    ]
+
+
 def check_availability_conflict(availability_data, exclude_id=None):
     """Check if there's a conflict with existing availability"""
-    start_time = availability_data['start_time']
-    end_time = availability_data['end_time']
-    
-    # Build query
-    query = Q(
-        start_time__lt=end_time,
-        end_time__gt=start_time,
-        is_active=True
-    )
-    
-    # Exclude specific ID if provided
-    if exclude_id:
-        query &= ~Q(availability_id=exclude_id)
-    
-    # Check for recurring availability conflicts
-    if availability_data.get('is_recurring', False):
-        day_of_week = availability_data['day_of_week']
-        query &= Q(is_recurring=True, day_of_week=day_of_week)
+    return bool(get_availability_conflicts(availability_data, exclude_id=exclude_id))
+
+
+def find_availability_conflicts(entries, replace_recurring=False):
+    """
+    Find which new availability entries overlap each other or existing
+    active availability, using the in-memory overlap index.
+
+    Returns the indexes of conflicting entries, in order. With
+    replace_recurring, existing recurring rows of the batch's doctors are
+    ignored because the batch is about to replace them.
+    """
+    rows = [availability_index_row(entry, position=position) for position, entry in enumerate(entries)]
+    index = get_availability_index(dated_from=_earliest_checked_date(rows))
+    conflicts = {
+        row['position'] for row in rows
+        if index.overlaps(row, include_recurring=not replace_recurring, dated_from=date.today())
+    }
+
+    # Overlaps within the batch, including new dated entries against new weekly ones
+    batch_index = AvailabilityIndex(rows)
+    for first, second in batch_index.overlapping_pairs():
+        conflicts.update((first['position'], second['position']))
+
+    return sorted(conflicts)
+
+
+def find_schedule_overlaps(start_date=None):
+    """Every overlapping pair in the active schedule, from one sweep of the index"""
+    return get_availability_index(dated_from=start_date).overlapping_pairs(start_date=start_date)
+
+
+def describe_availability_entry(entry):
+    """Short description of an availability entry for error responses"""
+    description = {
+        'start_time': entry['start_time'].strftime('%H:%M'),
+        'end_time': entry['end_time'].strftime('%H:%M'),
+    }
+    if entry.get('availability_id'):
+        description['availability_id'] = str(entry['availability_id'])
+    doctor_id = get_entry_doctor_id(entry)
+    if doctor_id is not None:
+        description['doctor_id'] = doctor_id
+    if entry.get('is_recurring', False):
+        description['day_of_week'] = entry['day_of_week']
+        description['day'] = dict(DoctorAvailability.DAY_CHOICES)[entry['day_of_week']]
     else:
-        # Check for specific date conflicts
-        specific_date = availability_data.get('date')
-        if specific_date:
-            query &= Q(is_recurring=False, date=specific_date)
-        else:
-            return False  # No date specified for non-recurring
-    
-    return DoctorAvailability.objects.filter(query).exists()
+        description['date'] = entry['date'].isoformat()
+    return description
 
 
-def get_next_available_date():
-    """Get the next available date for appointments"""
-    today = date.today()
-    current_date = today
-    
-    # Look for availability in the next 30 days
-    for _ in range(30):
-        current_date += timedelta(days=1)
-        availability = get_availability_for_date(current_date)
-        if availability:
-            return current_date
-    
-    return None
-
-
-def is_slot_available(appointment_date, appointment_time):
-    """Check if a specific slot is available"""
-    # Check if there's availability for this date and time
-    availability = get_availability_for_date(appointment_date)
-    
-    for avail in availability:
-        time_slots = generate_time_slots(
-            avail.start_time,
-            avail.end_time,
-            avail.slot_duration
+def create_availability_entries(entries):
+    """Insert availability entries in one statement and refresh the template"""
+    created = DoctorAvailability.objects.bulk_create([
+        DoctorAvailability(
+            doctor=entry.get('doctor'),
+            is_recurring=entry.get('is_recurring', False),
+            day_of_week=entry.get('day_of_week') if entry.get('is_recurring', False) else None,
+            date=None if entry.get('is_recurring', False) else entry['date'],
+            start_time=entry['start_time'],
+            end_time=entry['end_time'],
+            slot_duration=entry.get('slot_duration', 30),
         )
-        
-        if appointment_time in time_slots:
-            # Check if slot is booked
-            is_booked = Appointment.objects.filter(
-                appointment_date=appointment_date,
-                appointment_time=appointment_time,
-                status__in=['pending', 'confirmed']
-            ).exists()
-            
-            return not is_booked
-    
-    return False
-
-
-def get_appointment_statistics(start_date, end_date):
-    """Get appointment statistics for a date range"""
-    appointments = Appointment.objects.filter(
-        appointment_date__range=[start_date, end_date]
+        for entry in entries
+    ])
+
+    # bulk_create skips post_save, so invalidate explicitly
+    transaction.on_commit(invalidate_weekly_template)
+    return created
+
+
+def has_schedule_from(start_date, doctor_ids=None):
+    """Whether any of the given doctors has a weekly rule or a date override on or after start_date"""
+    templates = get_weekly_templates()
+    doctor_ids = resolve_doctor_ids(doctor_ids, templates)
+    if any(entries for doctor_id in doctor_ids for entries in templates[doctor_id].values()):
+        return True
+    if not doctor_ids:
+        return False
+    return DoctorAvailability.objects.filter(
+        doctor_filter(doctor_ids),
+        is_recurring=False,
+        date__gte=start_date,
+        is_active=True
+    ).exists()
+
+
+def find_next_available_slots(count, after=None, doctor_ids=None, max_days=MAX_CALENDAR_DAYS):
+    """
+    Find the first `count` free slots starting at or after `after` (a naive
+    local datetime, default now), looking at most max_days ahead.
+
+    Days are built NEXT_AVAILABLE_WINDOW_DAYS at a time from the cached
+    weekly template, so each window costs three grouped queries, and the
+    walk stops in the window where the last slot is found.
+    """
+    now = timezone.localtime().replace(tzinfo=None)
+    after = max(after, now) if after else now
+    last_date = after.date() + timedelta(days=max_days - 1)
+
+    if not has_schedule_from(after.date(), doctor_ids):
+        return []
+
+    found = []
+    window_start = after.date()
+    while window_start <= last_date:
+        window_end = min(window_start + timedelta(days=NEXT_AVAILABLE_WINDOW_DAYS - 1), last_date)
+        for current_date, slots in build_slots_for_range(window_start, window_end, doctor_ids).items():
+            for slot in slots_starting_from(only_available_slots(slots), current_date, after):
+                found.append({'date': current_date.strftime('%Y-%m-%d'), **slot})
+                if len(found) == count:
+                    return found
+        window_start = window_end + timedelta(days=1)
+
+    return found
+
+
+def get_next_available_date(doctor_ids=None):
+    """Get the next date with a free slot for any of the given doctors (all by default)"""
+    # Look for a free slot in the next 30 days, starting tomorrow
+    tomorrow = date.today() + timedelta(days=1)
+    slots = find_next_available_slots(
+        1, after=datetime.combine(tomorrow, time.min), doctor_ids=doctor_ids, max_days=30
     )
-    
-    stats = {
-        'total_appointments': appointments.count(),
-        'pending': appointments.filter(status='pending').count(),
-        'confirmed': appointments.filter(status='confirmed').count(),
-        'cancelled': appointments.filter(status='cancelled').count(),
-        'completed': appointments.filter(status='completed').count(),
-        'no_show': appointments.filter(status='no_show').count(),
-    }
-    
+    if not slots:
+        return None
+    return datetime.strptime(slots[0]['date'], '%Y-%m-%d').date()
+
+
+def get_available_doctors_for_slot(appointment_date, appointment_time, doctor_ids=None):
+    """
+    Get the doctors (None for the unassigned schedule) with a free slot at
+    the given date and time, in partition order, using three queries.
+    """
+    # Slots always start on a whole minute
+    if appointment_time.second or appointment_time.microsecond:
+        return []
+
+    doctor_ids = resolve_doctor_ids(doctor_ids)
+    if not doctor_ids:
+        return []
+    slot_minutes = time_to_minutes(appointment_time)
+
+    # Slot duration for each doctor whose schedule has this slot
+    durations = {}
+    for avail in get_availability_for_date(appointment_date, doctor_ids):
+        if avail.doctor_id not in durations and is_slot_in_window(
+            slot_minutes, avail.start_time, avail.end_time, avail.slot_duration
+        ):
+            durations[avail.doctor_id] = avail.slot_duration
+    if not durations:
+        return []
+
+    candidates = list(durations)
+    booked = set(Appointment.objects.filter(
+        doctor_filter(candidates),
+        appointment_date=appointment_date,
+        appointment_time=appointment_time,
+        status__in=ACTIVE_APPOINTMENT_STATUSES
+    ).values_list('doctor_id', flat=True))
+    # Holidays and leave override availability
+    blocked_by_date = get_blocked_windows_for_range(appointment_date, appointment_date, candidates)
+
+    return [
+        doctor_id for doctor_id in doctor_ids
+        if doctor_id in durations
+        and doctor_id not in booked
+        and not is_slot_blocked(
+            slot_minutes, durations[doctor_id], blocked_by_date.get((doctor_id, appointment_date), [])
+        )
+    ]
+
+
+def is_slot_available(appointment_date, appointment_time, doctor_id=None):
+    """Check if a specific slot is free for a doctor (the unassigned schedule by default)"""
+    return doctor_id in get_available_doctors_for_slot(appointment_date, appointment_time, [doctor_id])
+
+
+def encode_appointment_cursor(appointment):
+    """Encode an appointment's (created_at, appointment_id) position as an opaque cursor"""
+    position = json.dumps([appointment.created_at.isoformat(), str(appointment.appointment_id)])
+    return base64.urlsafe_b64encode(position.encode()).decode().rstrip('=')
+
+
+def decode_appointment_cursor(cursor):
+    """Decode a cursor into (created_at, appointment_id); raises ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, appointment_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), uuid.UUID(appointment_id)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+
+
+def get_appointment_statistics(start_date=None, end_date=None, bucket=None):
+    """Get appointment statistics, optionally bucketed by day or week, in one query"""
+    appointments = Appointment.objects.all()
+    if start_date:
+        appointments = appointments.filter(appointment_date__gte=start_date)
+    if end_date:
+        appointments = appointments.filter(appointment_date__lte=end_date)
+
+    group_fields = ['status']
+    if bucket:
+        appointments = appointments.annotate(period=STATISTICS_BUCKETS[bucket]('appointment_date'))
+        group_fields = ['period', 'status']
+
+    # Clear the default ordering so it doesn't leak into GROUP BY
+    rows = appointments.values(*group_fields).annotate(count=Count('pk')).order_by()
+
+    stats = empty_status_counts()
+    buckets = {}
+    for row in rows:
+        add_status_count(stats, row['status'], row['count'])
+        if bucket:
+            bucket_stats = buckets.setdefault(row['period'], empty_status_counts())
+            add_status_count(bucket_stats, row['status'], row['count'])
+
+    if bucket:
+        stats['buckets'] = [
+            {'period': period.strftime('%Y-%m-%d'), **buckets[period]}
+            for period in sorted(buckets)
+        ]
+
+    return stats
+
+
+def empty_status_counts():
+    """Get a zeroed statistics dict with one counter per appointment status"""
+    stats = {'total_appointments': 0}
+    stats.update({status: 0 for status in APPOINTMENT_STATUSES})
     return stats
+
+
+def add_status_count(stats, status, count):
+    """Add a per-status count to a statistics dict"""
+    stats['total_appointments'] += count
+    stats[status] = stats.get(status, 0) + count
+
+
+def format_appointment_time(value):
+    """Format an appointment time (time or HH:MM string) for display"""
+    return value.strftime('%I:%M %p') if hasattr(value, 'strftime') else str(value)
+
+
+def build_admin_booking_notification(appointment):
+    """Build (subject, body, recipients) for the admin new-booking notification"""
+    subject = f"New appointment request: {appointment.patient_name}"
+    body = (
+        f"A new appointment has been requested.\n\n"
+        f"Patient: {appointment.patient_name}\n"
+        f"Email: {appointment.patient_email}\n"
+        f"Phone: {appointment.patient_phone}\n"
+        f"Date: {appointment.appointment_date.strftime('%A, %d %B %Y')}\n"
+        f"Time: {format_appointment_time(appointment.appointment_time)}\n"
+        f"Notes: {appointment.notes or '-'}\n"
+    )
+    return subject, body, settings.ADMIN_NOTIFICATION_EMAILS
+
+
+def build_appointment_confirmation_email(appointment):
+    """Build (subject, body, recipients) for the patient booking acknowledgement"""
+    subject = "Your appointment request with Dr. Vivek Shetty"
+    body = (
+        f"Dear {appointment.patient_name},\n\n"
+        f"We have received your appointment request for "
+        f"{appointment.appointment_date.strftime('%A, %d %B %Y')} at "
+        f"{format_appointment_time(appointment.appointment_time)}. "
+        f"You will receive another email once it is confirmed.\n"
+    )
+    return subject, body, [appointment.patient_email]
+
+
+def build_appointment_status_update_email(appointment, old_status):
+    """Build (subject, body, recipients) for a patient status-change email"""
+    new_status = appointment.get_status_display()
+    subject = f"Your appointment has been {new_status.lower()}"
+    body = (
+        f"Dear {appointment.patient_name},\n\n"
+        f"Your appointment on {appointment.appointment_date.strftime('%A, %d %B %Y')} at "
+        f"{format_appointment_time(appointment.appointment_time)} "
+        f"has changed from {dict(Appointment.STATUS_CHOICES).get(old_status, old_status)} "
+        f"to {new_status}.\n"
+    )
+    return subject, body, [appointment.patient_email]
+
+
+def queue_email(subject, body, recipients, html_body=None):
+    """Write an email to the outbox; it is sent by the send_outbox worker.
+
+    Call inside the request's transaction so the email is only queued if
+    the change it describes is committed.
+    """
+    return EmailOutbox.objects.create(
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipients)
+    )
+
+
+def send_admin_booking_notification(appointment):
+    """Queue the admin notification for a new booking"""
+    queue_email(*build_admin_booking_notification(appointment))
+    return True
+
+
+def send_appointment_confirmation_email(appointment):
+    """Queue the booking acknowledgement email to the patient"""
+    queue_email(*build_appointment_confirmation_email(appointment))
+    return True
+
+
+def send_appointment_status_update_email(appointment, old_status):
+    """Queue the status update email to the patient"""
+    queue_email(*build_appointment_status_update_email(appointment, old_status))
+    return True
+
+
+def send_email_messages(email_messages):
+    """Send messages over one SMTP connection; returns an error (or None) per message"""
+    errors = []
+    mail_connection = get_connection(fail_silently=False)
+
+    try:
+        mail_connection.open()
+    except Exception as e:
+        return [str(e)] * len(email_messages)
+
+    try:
+        for email_message in email_messages:
+            try:
+                mail_connection.send_messages([email_message])
+                errors.append(None)
+            except Exception as e:
+                errors.append(str(e))
+    finally:
+        mail_connection.close()
+
+    return errors
+
+
+def build_email_message(subject, body, recipients, html_body=None, from_email=None):
+    """Build an EmailMultiAlternatives message"""
+    email_message = EmailMultiAlternatives(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(recipients)
+    )
+    if html_body:
+        email_message.attach_alternative(html_body, 'text/html')
+    return email_message
+
+
+def send_bulk_status_update_emails(status_changes):
+    """Send status update emails for many appointments over one SMTP connection.
+
+    status_changes is a list of (appointment, old_status) pairs. All messages
+    are rendered before the connection is opened. Messages that fail are
+    queued in the outbox for retry. Returns one result dict per recipient.
+    """
+    rendered = [
+        (appointment, build_appointment_status_update_email(appointment, old_status))
+        for appointment, old_status in status_changes
+    ]
+    errors = send_email_messages([build_email_message(*message) for _, message in rendered])
+
+    results = []
+    for (appointment, message), error in zip(rendered, errors):
+        if error is not None:
+            queue_email(*message)
+        results.append({
+            'appointment_id': str(appointment.appointment_id),
+            'recipient': appointment.patient_email,
+            'sent': error is None,
+            'queued_for_retry': error is not None,
+            'error': error
+        })
+
+    return results
+
+
+def claim_outbox_batch(batch_size):
+    """Claim a batch of due outbox messages for this worker.
+
+    Claimed messages are leased for EMAIL_OUTBOX_LEASE_SECONDS, so a
+    crashed worker's batch is retried once the lease expires. Concurrent
+    workers skip each other's rows on databases with SKIP LOCKED support;
+    run a single worker on SQLite.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        due_messages = EmailOutbox.objects.filter(
+            status__in=['pending', 'sending'],
+            next_attempt_at__lte=now
+        ).order_by('next_attempt_at')
+        if connection.features.has_select_for_update_skip_locked:
+            due_messages = due_messages.select_for_update(skip_locked=True)
+
+        batch = list(due_messages[:batch_size])
+        EmailOutbox.objects.filter(pk__in=[message.pk for message in batch]).update(
+            status='sending',
+            next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+        )
+
+    return batch
+
+
+def deliver_outbox_batch(batch_size=None, max_attempts=None):
+    """Send one batch of due outbox messages and record the results"""
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    max_attempts = max_attempts or settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+    results = {'sent': 0, 'retrying': 0, 'failed': 0}
+
+    batch = claim_outbox_batch(batch_size)
+    if not batch:
+        return results
+
+    errors = send_email_messages([
+        build_email_message(
+            message.subject,
+            message.body,
+            message.recipients,
+            html_body=message.html_body,
+            from_email=message.from_email
+        )
+        for message in batch
+    ])
+
+    now = timezone.now()
+    for message, error in zip(batch, errors):
+        message.attempts += 1
+        if error is None:
+            message.status = 'sent'
+            message.sent_at = now
+            message.last_error = None
+            results['sent'] += 1
+        elif message.attempts >= max_attempts:
+            message.status = 'failed'
+            message.last_error = error
+            results['failed'] += 1
+        else:
+            # Exponential backoff: base delay doubled for every failed attempt
+            message.status = 'pending'
+            message.next_attempt_at = now + timedelta(
+                seconds=settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (message.attempts - 1)
+            )
+            message.last_error = error
+            results['retrying'] += 1
+        message.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+
+    return results
@@ -1,10 +1,10 @@
 """
 API views for doctor availability management
 """
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404, render
@@ -14,27 +14,58 @@ from django.utils.decorators import method_decorator
 from django.views import View
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
 import json
 import logging
 import math
+import uuid
 
-from .models import DoctorAvailability, Appointment
+from authentication.permissions import IsClinicAdmin, IsFullClinicAdmin
+
+from .models import DoctorAvailability, AvailabilityException, Appointment
 from .serializers import (
     DoctorAvailabilitySerializer, 
     RecurringAvailabilityCreateSerializer,
     AvailableSlotsSerializer,
+    AvailabilityExceptionSerializer,
+    AvailabilityImportSerializer,
     AppointmentCreateSerializer,
     AppointmentSerializer
 )
+from .conditional import etag_matches, make_etag, not_modified_response, with_etag
+from .middleware import request_metrics
 from .utils import (
+    APPOINTMENT_STATUSES,
+    MAX_CALENDAR_DAYS,
+    MAX_NEXT_AVAILABLE_SLOTS,
+    STATISTICS_BUCKETS,
+    bump_appointments_version,
+    bump_slot_date_versions,
+    get_appointment_statistics,
+    get_appointments_version,
     get_available_slots_for_date,
-    get_only_available_slots_for_date,
-    check_availability_conflict,
+    get_available_slots_for_range,
+    get_cached_available_slots,
+    get_slot_versions,
+    create_availability_entries,
+    describe_availability_entry,
+    find_availability_conflicts,
+    find_next_available_slots,
+    find_schedule_overlaps,
+    decode_appointment_cursor,
+    encode_appointment_cursor,
+    get_availability_conflicts,
     get_availability_for_date,
+    get_availability_version,
+    get_available_doctors_for_slot,
+    get_doctor_partitions,
+    invalidate_weekly_template,
     send_appointment_confirmation_email,
     send_appointment_status_update_email,
-    send_admin_booking_notification
+    send_admin_booking_notification,
+    send_bulk_status_update_emails
 )
 
 logger = logging.getLogger(__name__)
@@ -42,57 +73,67 @@ logger = logging.getLogger(__name__)
 
 class DoctorAvailabilityView(APIView):
     """Handle CRUD operations for doctor availability"""
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsClinicAdmin]
+    # Only full admins may change the schedule
+    clinic_capabilities = {'POST': 'manage', 'PUT': 'manage', 'DELETE': 'manage'}
 
     def get(self, request):
         """Get availability entries"""
-        # Check if user is admin
-        if not (request.user.is_staff or request.user.is_superuser):
-            return Response({'error': 'Admin privileges required'}, status=status.HTTP_403_FORBIDDEN)
-
         # Get query parameters
         date_param = request.GET.get('date')
         recurring_param = request.GET.get('recurring')
         availability_id = request.GET.get('id')
+        doctor_ids, error_response = _get_doctor_ids(request)
+        if error_response:
+            return error_response
+
+        # Every availability write bumps the availability version
+        etag = make_etag('availability', get_availability_version(), request.GET.get('doctor_id', ''))
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
 
         try:
             if availability_id:
                 # Get specific availability entry
                 availability = get_object_or_404(DoctorAvailability, availability_id=availability_id)
                 serializer = DoctorAvailabilitySerializer(availability)
-                return Response({
+                return with_etag(Response({
                     'success': True,
                     'availability': serializer.data
-                })
+                }), etag)
 
             elif date_param:
                 # Get availability for specific date
                 target_date = datetime.strptime(date_param, '%Y-%m-%d').date()
-                availability = get_availability_for_date(target_date)
+                availability = get_availability_for_date(target_date, doctor_ids)
                 serializer = DoctorAvailabilitySerializer(availability, many=True)
-                return Response({
+                return with_etag(Response({
                     'success': True,
                     'date': date_param,
                     'availability': serializer.data
-                })
+                }), etag)
 
             elif recurring_param == 'true':
                 # Get all recurring availability
                 availability = DoctorAvailability.objects.filter(is_recurring=True).order_by('day_of_week', 'start_time')
+                if doctor_ids:
+                    availability = availability.filter(doctor_id__in=doctor_ids)
                 serializer = DoctorAvailabilitySerializer(availability, many=True)
-                return Response({
+                return with_etag(Response({
                     'success': True,
                     'recurring': serializer.data
-                })
+                }), etag)
 
             else:
                 # Get all availability entries
                 availability = DoctorAvailability.objects.all().order_by('date', 'day_of_week', 'start_time')
+                if doctor_ids:
+                    availability = availability.filter(doctor_id__in=doctor_ids)
                 serializer = DoctorAvailabilitySerializer(availability, many=True)
-                return Response({
+                return with_etag(Response({
                     'success': True,
                     'availability': serializer.data
-                })
+                }), etag)
 
         except ValueError:
             return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
@@ -102,10 +143,6 @@ class DoctorAvailabilityView(APIView):
 
     def post(self, request):
         """Create new availability entry"""
-        # Check if user is admin
-        if not (request.user.is_staff or request.user.is_superuser):
-            return Response({'error': 'Admin privileges required'}, status=status.HTTP_403_FORBIDDEN)
-
         try:
             # Check if this is a recurring availability creation
             if 'days' in request.data:
@@ -124,33 +161,25 @@ class DoctorAvailabilityView(APIView):
             return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
         data = serializer.validated_data
-        created_availability = []
+        entries = [
+            {
+                'is_recurring': True,
+                'day_of_week': day,
+                'start_time': data['start_time'],
+                'end_time': data['end_time'],
+                'slot_duration': data['slot_duration'],
+                'doctor': data['doctor']
+            }
+            for day in data['days']
+        ]
 
         with transaction.atomic():
-            for day in data['days']:
-                # Check for conflicts
-                availability_data = {
-                    'is_recurring': True,
-                    'day_of_week': day,
-                    'start_time': data['start_time'],
-                    'end_time': data['end_time']
-                }
-
-                if check_availability_conflict(availability_data):
-                    day_name = dict(DoctorAvailability.DAY_CHOICES)[day]
-                    return Response({
-                        'error': f'Conflict detected for {day_name}. Overlapping availability already exists.'
-                    }, status=status.HTTP_400_BAD_REQUEST)
+            # One query covers every requested day
+            conflicts = find_availability_conflicts(entries)
+            if conflicts:
+                return _availability_conflict_response(entries, conflicts)
 
-                # Create availability entry
-                availability = DoctorAvailability.objects.create(
-                    is_recurring=True,
-                    day_of_week=day,
-                    start_time=data['start_time'],
-                    end_time=data['end_time'],
-                    slot_duration=data['slot_duration']
-                )
-                created_availability.append(availability)
+            created_availability = create_availability_entries(entries)
 
         # Serialize response
         serializer = DoctorAvailabilitySerializer(created_availability, many=True)
@@ -166,13 +195,16 @@ class DoctorAvailabilityView(APIView):
         if not serializer.is_valid():
             return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Check for conflicts
-        if check_availability_conflict(serializer.validated_data):
+        # Check for conflicts, including dated entries against weekly rules
+        conflicts = get_availability_conflicts(serializer.validated_data)
+        if conflicts:
             return Response({
-                'error': 'Conflict detected. Overlapping availability already exists.'
+                'error': 'Conflict detected. Overlapping availability already exists.',
+                'conflicts': [describe_availability_entry(row) for row in conflicts]
             }, status=status.HTTP_400_BAD_REQUEST)
 
         availability = serializer.save()
+        invalidate_weekly_template()
         return Response({
             'success': True,
             'message': 'Availability created successfully',
@@ -181,10 +213,6 @@ class DoctorAvailabilityView(APIView):
 
     def put(self, request, availability_id=None):
         """Update existing availability entry"""
-        # Check if user is admin
-        if not (request.user.is_staff or request.user.is_superuser):
-            return Response({'error': 'Admin privileges required'}, status=status.HTTP_403_FORBIDDEN)
-
         if not availability_id:
             return Response({'error': 'Availability ID is required'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -194,7 +222,8 @@ class DoctorAvailabilityView(APIView):
             # Check if there are existing appointments for this availability
             if not availability.is_recurring and availability.date:
                 existing_appointments = Appointment.objects.filter(
-                    date=availability.date,
+                    appointment_date=availability.date,
+                    doctor=availability.doctor,
                     status__in=['pending', 'confirmed']
                 ).exists()
                 
@@ -207,13 +236,20 @@ class DoctorAvailabilityView(APIView):
             if not serializer.is_valid():
                 return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Check for conflicts (excluding current record)
-            if check_availability_conflict(serializer.validated_data, exclude_id=availability_id):
+            # Check the entry as it will be after a partial update (excluding current record)
+            updated_entry = {
+                field: serializer.validated_data.get(field, getattr(availability, field))
+                for field in ('doctor', 'is_recurring', 'day_of_week', 'date', 'start_time', 'end_time')
+            }
+            conflicts = get_availability_conflicts(updated_entry, exclude_id=availability_id)
+            if conflicts:
                 return Response({
-                    'error': 'Conflict detected. Overlapping availability already exists.'
+                    'error': 'Conflict detected. Overlapping availability already exists.',
+                    'conflicts': [describe_availability_entry(row) for row in conflicts]
                 }, status=status.HTTP_400_BAD_REQUEST)
 
             availability = serializer.save()
+            invalidate_weekly_template()
             return Response({
                 'success': True,
                 'message': 'Availability updated successfully',
@@ -226,10 +262,6 @@ class DoctorAvailabilityView(APIView):
 
     def delete(self, request, availability_id=None):
         """Delete availability entry"""
-        # Check if user is admin
-        if not (request.user.is_staff or request.user.is_superuser):
-            return Response({'error': 'Admin privileges required'}, status=status.HTTP_403_FORBIDDEN)
-
         if not availability_id:
             return Response({'error': 'Availability ID is required'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -239,7 +271,8 @@ class DoctorAvailabilityView(APIView):
             # Check if there are existing appointments for this availability
             if not availability.is_recurring and availability.date:
                 existing_appointments = Appointment.objects.filter(
-                    date=availability.date,
+                    appointment_date=availability.date,
+                    doctor=availability.doctor,
                     status__in=['pending', 'confirmed']
                 ).count()
                 
@@ -249,6 +282,7 @@ class DoctorAvailabilityView(APIView):
                     }, status=status.HTTP_400_BAD_REQUEST)
 
             availability.delete()
+            invalidate_weekly_template()
             return Response({
                 'success': True,
                 'message': 'Availability deleted successfully'
@@ -259,6 +293,215 @@ class DoctorAvailabilityView(APIView):
             return Response({'error': f'Server error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _get_doctor_ids(request):
+    """
+    Parse ?doctor_id= into the doctor list taken by the slot helpers.
+    Returns (doctor_ids, error_response); doctor_ids is None for all doctors.
+    """
+    doctor_param = request.GET.get('doctor_id')
+    if not doctor_param:
+        return None, None
+
+    try:
+        doctor_id = int(doctor_param)
+    except ValueError:
+        doctor_id = None
+    if doctor_id is None or doctor_id not in get_doctor_partitions():
+        return None, Response({'error': 'Invalid doctor_id'}, status=status.HTTP_400_BAD_REQUEST)
+    return [doctor_id], None
+
+
+def _availability_conflict_response(entries, conflicts):
+    """400 response listing every conflicting entry at once"""
+    conflicting = [describe_availability_entry(entries[index]) for index in conflicts]
+    labels = ', '.join(dict.fromkeys(entry.get('day') or entry['date'] for entry in conflicting))
+    return Response({
+        'error': f'Conflict detected for {labels}. Overlapping availability already exists.',
+        'conflicts': conflicting
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+class AvailabilityImportView(APIView):
+    """Import a whole weekly schedule and/or dated overrides in one request"""
+    permission_classes = [IsFullClinicAdmin]
+
+    def post(self, request):
+        """
+        Expects {"weekly": [{"day_of_week", "start_time", "end_time", "slot_duration"}],
+        "overrides": [{"date", "start_time", "end_time", "slot_duration"}],
+        "replace_weekly": false, "doctor": null}. Entries belong to the given
+        doctor; with replace_weekly that doctor's recurring schedule is
+        swapped for the imported one.
+        """
+        serializer = AvailabilityImportSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        replace_weekly = data['replace_weekly']
+        doctor = data['doctor']
+        entries = [
+            {'is_recurring': True, 'doctor': doctor, **entry} for entry in data.get('weekly', [])
+        ] + [
+            {'is_recurring': False, 'doctor': doctor, **entry} for entry in data.get('overrides', [])
+        ]
+
+        try:
+            with transaction.atomic():
+                conflicts = find_availability_conflicts(entries, replace_recurring=replace_weekly)
+                if conflicts:
+                    return _availability_conflict_response(entries, conflicts)
+
+                replaced = 0
+                if replace_weekly:
+                    replaced, _ = DoctorAvailability.objects.filter(is_recurring=True, doctor=doctor).delete()
+
+                created_availability = create_availability_entries(entries)
+
+        except Exception as e:
+            logger.error(f"Error importing availability: {str(e)}")
+            return Response({'error': f'Server error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response({
+            'success': True,
+            'message': f'Imported {len(created_availability)} availability entries',
+            'replaced': replaced,
+            'availability': DoctorAvailabilitySerializer(created_availability, many=True).data
+        }, status=status.HTTP_201_CREATED)
+
+
+class AvailabilityExceptionView(APIView):
+    """Handle CRUD operations for blocked dates and hours (holidays, leave)"""
+    permission_classes = [IsClinicAdmin]
+    # Only full admins may change the schedule
+    clinic_capabilities = {'POST': 'manage', 'PUT': 'manage', 'DELETE': 'manage'}
+
+    def get(self, request, exception_id=None):
+        """List exceptions, optionally only those overlapping ?from=&to="""
+        if exception_id:
+            exception = get_object_or_404(AvailabilityException, exception_id=exception_id)
+            return Response({
+                'success': True,
+                'exception': AvailabilityExceptionSerializer(exception).data
+            })
+
+        try:
+            exceptions = AvailabilityException.objects.all()
+            from_param = request.GET.get('from')
+            to_param = request.GET.get('to')
+            if from_param:
+                exceptions = exceptions.filter(end_date__gte=datetime.strptime(from_param, '%Y-%m-%d').date())
+            if to_param:
+                exceptions = exceptions.filter(start_date__lte=datetime.strptime(to_param, '%Y-%m-%d').date())
+        except ValueError:
+            return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'success': True,
+            'exceptions': AvailabilityExceptionSerializer(exceptions, many=True).data
+        })
+
+    def post(self, request, exception_id=None):
+        """Block a date range, optionally only between start_time and end_time"""
+        serializer = AvailabilityExceptionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            exception = serializer.save()
+        except Exception as e:
+            logger.error(f"Error creating availability exception: {str(e)}")
+            return Response({'error': f'Server error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response({
+            'success': True,
+            'message': 'Exception created successfully',
+            'exception': AvailabilityExceptionSerializer(exception).data,
+            'affected_appointments': _count_blocked_appointments(exception)
+        }, status=status.HTTP_201_CREATED)
+
+    def put(self, request, exception_id=None):
+        """Update an existing exception"""
+        if not exception_id:
+            return Response({'error': 'Exception ID is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        exception = get_object_or_404(AvailabilityException, exception_id=exception_id)
+        serializer = AvailabilityExceptionSerializer(exception, data=request.data, partial=True)
+        if not serializer.is_valid():
+            return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            exception = serializer.save()
+        except Exception as e:
+            logger.error(f"Error updating availability exception: {str(e)}")
+            return Response({'error': f'Server error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response({
+            'success': True,
+            'message': 'Exception updated successfully',
+            'exception': AvailabilityExceptionSerializer(exception).data,
+            'affected_appointments': _count_blocked_appointments(exception)
+        })
+
+    def delete(self, request, exception_id=None):
+        """Delete an exception, reopening its slots"""
+        if not exception_id:
+            return Response({'error': 'Exception ID is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        exception = get_object_or_404(AvailabilityException, exception_id=exception_id)
+        exception.delete()
+        return Response({
+            'success': True,
+            'message': 'Exception deleted successfully'
+        })
+
+
+def _count_blocked_appointments(exception):
+    """Count active appointments that fall inside an exception, so admins can reschedule them"""
+    appointments = Appointment.objects.filter(
+        appointment_date__range=[exception.start_date, exception.end_date],
+        status__in=['pending', 'confirmed']
+    )
+    # Practice-wide exceptions affect every doctor's bookings
+    if exception.doctor_id:
+        appointments = appointments.filter(doctor_id=exception.doctor_id)
+    if exception.start_time:
+        appointments = appointments.filter(appointment_time__gte=exception.start_time)
+    if exception.end_time:
+        appointments = appointments.filter(appointment_time__lt=exception.end_time)
+    return appointments.count()
+
+
+@api_view(['GET'])
+@permission_classes([IsClinicAdmin])
+def lint_schedule(request):
+    """Report every overlapping pair of availability entries (admin only).
+
+    Covers weekly rules on the same weekday and dated entries against each
+    other and against their weekday's rules, from ?from= (default today).
+    """
+    from_param = request.GET.get('from')
+    try:
+        start_date = datetime.strptime(from_param, '%Y-%m-%d').date() if from_param else date.today()
+    except ValueError:
+        return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+
+    etag = make_etag('schedule-lint', get_availability_version(), start_date.isoformat())
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+
+    overlaps = [
+        {'first': describe_availability_entry(first), 'second': describe_availability_entry(second)}
+        for first, second in find_schedule_overlaps(start_date=start_date)
+    ]
+    return with_etag(Response({
+        'success': True,
+        'from': start_date.strftime('%Y-%m-%d'),
+        'total_overlaps': len(overlaps),
+        'overlaps': overlaps
+    }), etag)
+
+
 class AppointmentCreateView(APIView):
     """Handle creation (POST) and listing (GET) of appointments."""
     
@@ -270,8 +513,8 @@ class AppointmentCreateView(APIView):
             # POST (create appointment) - no authentication required
             permission_classes = [AllowAny]
         else:
-            # GET (list appointments) - authentication required
-            permission_classes = [IsAuthenticated]
+            # GET (list appointments) - clinic staff only
+            permission_classes = [IsClinicAdmin]
         
         return [permission() for permission in permission_classes]
 
@@ -315,24 +558,22 @@ class AppointmentCreateView(APIView):
             # Create a temporary appointment object for email template
             from .models import Appointment
             temp_appointment = Appointment(
-                name=data['name'],
-                email=data['email'],
-                phone=data['phone'],
-                date=appointment_date,
-                time=data['time'],
-                message=data.get('message', ''),
+                patient_name=data['name'],
+                patient_email=data['email'],
+                patient_phone=data['phone'],
+                appointment_date=appointment_date,
+                appointment_time=data['time'],
+                notes=data.get('message', ''),
                 status='pending'
             )
-            temp_appointment.id = 0  # Temporary ID for email template
             temp_appointment.created_at = datetime.now()
 
-            # Send admin notification email only
+            # Queue admin notification email only
             admin_email_sent = False
             try:
-                from .utils import send_admin_booking_notification
                 admin_email_sent = send_admin_booking_notification(temp_appointment)
             except Exception as e:
-                print(f"Error sending admin notification email: {str(e)}")
+                logger.error(f"Error queueing admin notification email: {str(e)}")
                 # Don't fail if email fails
 
             return JsonResponse({
@@ -361,11 +602,6 @@ class AppointmentCreateView(APIView):
 
     def get(self, request):
         """Return paginated list of all appointments - requires authentication"""
-        # DRF handles JWT authentication automatically via get_permissions()
-        # Just check if user is admin
-        if not (request.user.is_staff or request.user.is_superuser):
-            return Response({'error': 'Admin privileges required'}, status=status.HTTP_403_FORBIDDEN)
-
         # Get pagination parameters from URL
         page = request.GET.get('page', 1)
         limit = request.GET.get('limit', 10)
@@ -388,8 +624,44 @@ class AppointmentCreateView(APIView):
             page = 1
             limit = 10
 
+        # Total count is optional; skipping it avoids a COUNT(*) per request
+        with_count = request.GET.get('with_count', '1').lower() not in ('0', 'false')
+
+        # Every insert, update or delete bumps the table's change counter
+        etag = make_etag('appointments', get_appointments_version())
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+
+        return with_etag(self._get_page(request, page, limit, with_count), etag)
+
+    def _get_page(self, request, page, limit, with_count):
+        """Return a page of appointments in cursor or page/limit mode"""
+        if 'cursor' in request.GET:
+            return self._get_cursor_page(request.GET.get('cursor'), limit, with_count)
+
         # Get all appointments ordered by creation date (newest first)
-        appointments_queryset = Appointment.objects.all().order_by('-created_at')
+        appointments_queryset = Appointment.objects.all().order_by('-created_at', '-appointment_id')
+
+        if not with_count:
+            # Fetch one extra row to find out whether there is a next page
+            offset = (page - 1) * limit
+            rows = list(appointments_queryset[offset:offset + limit + 1])
+            return Response({
+                'success': True,
+                'appointments': [_serialize_appointment_summary(a) for a in rows[:limit]],
+                'pagination': {
+                    'total': None,
+                    'totalPages': None,
+                    'currentPage': page,
+                    'limit': limit,
+                    'hasNextPage': len(rows) > limit,
+                    'hasPreviousPage': page > 1,
+                },
+                'count': None,
+                'page': page,
+                'limit': limit,
+                'totalPages': None,
+            })
         
         # Create paginator
         paginator = Paginator(appointments_queryset, limit)
@@ -406,20 +678,7 @@ class AppointmentCreateView(APIView):
             page = total_pages
 
         # Serialize appointment data
-        appointments_data = [
-            {
-                'id': a.id,
-                'name': a.name,
-                'email': a.email,
-                'phone': a.phone,
-                'date': a.date.strftime('%Y-%m-%d'),
-                'time': a.time,
-                'message': a.message,
-                'status': a.status,
-                'created_at': a.created_at.isoformat(),
-                'updated_at': a.updated_at.isoformat(),
-            } for a in appointments_page
-        ]
+        appointments_data = [_serialize_appointment_summary(a) for a in appointments_page]
 
         # Multiple pagination formats as requested
         response_data = {
@@ -447,88 +706,128 @@ class AppointmentCreateView(APIView):
 
         return Response(response_data)
 
+    def _get_cursor_page(self, cursor, limit, with_count):
+        """Return a keyset page of appointments, newest first, after an opaque cursor"""
+        appointments_queryset = Appointment.objects.all().order_by('-created_at', '-appointment_id')
+        page_queryset = appointments_queryset
+
+        if cursor:
+            try:
+                created_at, appointment_id = decode_appointment_cursor(cursor)
+            except ValueError:
+                return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+
+            page_queryset = page_queryset.filter(
+                Q(created_at__lt=created_at) |
+                Q(created_at=created_at, appointment_id__lt=appointment_id)
+            )
+
+        # Fetch one extra row to find out whether there is a next page
+        rows = list(page_queryset[:limit + 1])
+        appointments_page = rows[:limit]
+        has_next = len(rows) > limit
+        next_cursor = encode_appointment_cursor(appointments_page[-1]) if has_next else None
+        total_count = appointments_queryset.count() if with_count else None
+
+        return Response({
+            'success': True,
+            'appointments': [_serialize_appointment_summary(a) for a in appointments_page],
+            'pagination': {
+                'total': total_count,
+                'limit': limit,
+                'hasNextPage': has_next,
+                'nextCursor': next_cursor,
+            },
+            'count': total_count,
+            'next': next_cursor,
+            'limit': limit,
+        })
+
+
+def _serialize_appointment_summary(appointment):
+    """Serialize an appointment for the admin appointment list"""
+    return {
+        'id': str(appointment.appointment_id),
+        'name': appointment.patient_name,
+        'email': appointment.patient_email,
+        'phone': appointment.patient_phone,
+        'date': appointment.appointment_date.strftime('%Y-%m-%d'),
+        'time': appointment.appointment_time.strftime('%H:%M'),
+        'message': appointment.notes,
+        'status': appointment.status,
+        'created_at': appointment.created_at.isoformat(),
+        'updated_at': appointment.updated_at.isoformat(),
+    }
+
 
 @api_view(['GET', 'PUT', 'DELETE'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsClinicAdmin])
 def appointment_detail_view(request, appointment_id):
     """Handle individual appointment operations: GET, PUT, DELETE - requires authentication"""
     
-    # Check if user is admin
-    if not (request.user.is_staff or request.user.is_superuser):
-        return Response({'error': 'Admin privileges required'}, status=status.HTTP_403_FORBIDDEN)
-    
+    # Outside the try so a missing appointment stays a 404
+    appointment = get_object_or_404(Appointment, appointment_id=appointment_id)
+
     try:
-        appointment = get_object_or_404(Appointment, id=appointment_id)
-        
         if request.method == 'GET':
-            return Response({
+            etag = make_etag('appointment', appointment.pk, appointment.updated_at.timestamp())
+            if etag_matches(request, etag):
+                return not_modified_response(etag)
+
+            return with_etag(Response({
                 'success': True,
-                'appointment': {
-                    'id': appointment.id,
-                    'name': appointment.name,
-                    'email': appointment.email,
-                    'phone': appointment.phone,
-                    'date': appointment.date.strftime('%Y-%m-%d'),
-                    'time': appointment.time,
-                    'message': appointment.message,
-                    'status': appointment.status,
-                    'created_at': appointment.created_at.isoformat(),
-                    'updated_at': appointment.updated_at.isoformat(),
-                }
-            })
+                'appointment': _serialize_appointment_summary(appointment)
+            }), etag)
             
         elif request.method == 'PUT':
             data = request.data
             old_status = appointment.status  # Store old status for email notification
+            old_date = appointment.appointment_date
             
             # Update fields if provided
             if 'name' in data:
-                appointment.name = data['name']
+                appointment.patient_name = data['name']
             if 'email' in data:
-                appointment.email = data['email']
+                appointment.patient_email = data['email']
             if 'phone' in data:
-                appointment.phone = data['phone']
+                appointment.patient_phone = data['phone']
             if 'date' in data:
                 try:
-                    appointment.date = datetime.strptime(data['date'], '%Y-%m-%d').date()
+                    appointment.appointment_date = datetime.strptime(data['date'], '%Y-%m-%d').date()
                 except ValueError:
                     return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, 
                                  status=status.HTTP_400_BAD_REQUEST)
             if 'time' in data:
-                appointment.time = data['time']
+                try:
+                    appointment.appointment_time = datetime.strptime(data['time'], '%H:%M').time()
+                except ValueError:
+                    return Response({'error': 'Invalid time format. Use HH:MM'}, 
+                                 status=status.HTTP_400_BAD_REQUEST)
             if 'message' in data:
-                appointment.message = data['message']
+                appointment.notes = data['message']
             if 'status' in data:
                 if data['status'] not in ['pending', 'confirmed', 'cancelled', 'completed']:
                     return Response({'error': 'Invalid status'}, 
                                  status=status.HTTP_400_BAD_REQUEST)
                 appointment.status = data['status']
 
-            appointment.save()
-            
-            # Send status update email if status changed
+            # Save and queue the status update email (if status changed) together;
+            # moving onto an active booking's slot raises IntegrityError
             email_sent = False
-            if old_status != appointment.status:
-                try:
+            with transaction.atomic():
+                appointment.save()
+                if old_status != appointment.status:
                     email_sent = send_appointment_status_update_email(appointment, old_status)
-                except Exception as e:
-                    logger.error(f"Error sending status update email: {str(e)}")
+
+            # post_save only invalidates the new date's slots
+            if old_date != appointment.appointment_date:
+                bump_slot_date_versions([old_date])
 
             return Response({
                 'success': True,
                 'message': 'Appointment updated successfully',
                 'email_sent': email_sent,
-                'appointment': {
-                    'id': appointment.id,
-                    'name': appointment.name,
-                    'email': appointment.email,
-                    'phone': appointment.phone,
-                    'date': appointment.date.strftime('%Y-%m-%d'),
-                    'time': appointment.time,
-                    'message': appointment.message,
-                    'status': appointment.status,
-                    'updated_at': appointment.updated_at.isoformat(),
-                }
+                'appointment': _serialize_appointment_summary(appointment)
             })
             
         elif request.method == 'DELETE':
@@ -538,40 +837,129 @@ def appointment_detail_view(request, appointment_id):
                 'message': 'Appointment deleted successfully'
             })
             
+    except IntegrityError:
+        return Response({'error': 'This time slot is already booked'}, status=status.HTTP_409_CONFLICT)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsClinicAdmin])
+def bulk_update_appointment_status(request):
+    """Change the status of many appointments at once and notify patients - admin only.
+
+    Expects {"appointment_ids": [...], "status": "cancelled"}. Patient emails
+    are sent over a single SMTP connection once the update is committed.
+    """
+    
+    appointment_ids = request.data.get('appointment_ids')
+    new_status = request.data.get('status')
+
+    if not isinstance(appointment_ids, list) or not appointment_ids:
+        return Response({'error': 'appointment_ids must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+    if new_status not in ['pending', 'confirmed', 'cancelled', 'completed']:
+        return Response({'error': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        appointment_ids = {str(uuid.UUID(str(appointment_id))) for appointment_id in appointment_ids}
+    except ValueError:
+        return Response({'error': 'Invalid appointment ID'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        with transaction.atomic():
+            appointments = list(
+                Appointment.objects.select_for_update().filter(appointment_id__in=appointment_ids)
+            )
+            changed = [a for a in appointments if a.status != new_status]
+
+            Appointment.objects.filter(pk__in=[a.pk for a in changed]).update(
+                status=new_status,
+                updated_at=timezone.now()
+            )
+
+        # update() skips post_save, so invalidate cached slots and the list ETag explicitly
+        bump_slot_date_versions(a.appointment_date for a in changed)
+        bump_appointments_version()
+
+        status_changes = []
+        for appointment in changed:
+            status_changes.append((appointment, appointment.status))
+            appointment.status = new_status
+
+        found_ids = {str(a.appointment_id) for a in appointments}
+        logger.info(f"Bulk status change of {len(changed)} appointments to '{new_status}'")
+
+        return Response({
+            'success': True,
+            'message': f'Updated {len(changed)} appointments',
+            'updated': len(changed),
+            'unchanged': sorted(found_ids - {str(a.appointment_id) for a in changed}),
+            'not_found': sorted(appointment_ids - found_ids),
+            'notifications': send_bulk_status_update_emails(status_changes) if status_changes else []
+        })
+
+    except IntegrityError:
+        return Response({
+            'error': 'One or more time slots are already booked by other appointments'
+        }, status=status.HTTP_409_CONFLICT)
     except Exception as e:
+        logger.error(f"Error in bulk status update: {str(e)}")
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 @api_view(['GET'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsClinicAdmin])
 def get_appointment_stats(request):
-    """Get appointment statistics - requires admin authentication."""
+    """Get appointment statistics - requires admin authentication.
+
+    Supports optional ?from=&to= date filters and ?bucket=day|week for a
+    per-period breakdown, all computed in a single query.
+    """
     
-    # Check if user is admin
-    if not (request.user.is_staff or request.user.is_superuser):
-        return Response({'error': 'Admin privileges required'}, status=status.HTTP_403_FORBIDDEN)
+    from_param = request.GET.get('from')
+    to_param = request.GET.get('to')
+    bucket = request.GET.get('bucket')
+
+    if bucket and bucket not in STATISTICS_BUCKETS:
+        return Response({
+            'error': f"Invalid bucket. Use one of: {', '.join(STATISTICS_BUCKETS)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        total_appointments = Appointment.objects.count()
-        pending_count = Appointment.objects.filter(status='pending').count()
-        confirmed_count = Appointment.objects.filter(status='confirmed').count()
-        completed_count = Appointment.objects.filter(status='completed').count()
-        cancelled_count = Appointment.objects.filter(status='cancelled').count()
+        start_date = datetime.strptime(from_param, '%Y-%m-%d').date() if from_param else None
+        end_date = datetime.strptime(to_param, '%Y-%m-%d').date() if to_param else None
+    except ValueError:
+        return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        statistics = get_appointment_statistics(start_date, end_date, bucket)
 
-        return Response({
+        response_data = {
             'success': True,
-            'stats': {
-                'total': total_appointments,
-                'pending': pending_count,
-                'confirmed': confirmed_count,
-                'completed': completed_count,
-                'cancelled': cancelled_count
-            }
-        })
+            'stats': _format_status_counts(statistics)
+        }
+        if start_date or end_date:
+            response_data['from'] = from_param
+            response_data['to'] = to_param
+        if bucket:
+            response_data['bucket'] = bucket
+            response_data['buckets'] = [
+                {'period': period['period'], **_format_status_counts(period)}
+                for period in statistics['buckets']
+            ]
+
+        return Response(response_data)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _format_status_counts(statistics):
+    """Shape a statistics dict for the stats API"""
+    counts = {'total': statistics['total_appointments']}
+    counts.update({status_name: statistics[status_name] for status_name in APPOINTMENT_STATUSES})
+    return counts
+
+
 @api_view(['GET', 'POST'])
 @permission_classes([AllowAny])
 def confirm_appointment(request, appointment_id):
@@ -579,37 +967,32 @@ def confirm_appointment(request, appointment_id):
     
     # Simple security check - verify appointment exists and is pending
     try:
-        appointment = Appointment.objects.get(id=appointment_id)
+        appointment = Appointment.objects.get(appointment_id=appointment_id)
         if appointment.status != 'pending':
             return Response({'error': 'Appointment is not in pending status'}, status=status.HTTP_400_BAD_REQUEST)
     except Appointment.DoesNotExist:
         return Response({'error': 'Appointment not found'}, status=status.HTTP_404_NOT_FOUND)
     
     try:
-        appointment = Appointment.objects.get(id=appointment_id)
+        appointment = Appointment.objects.get(appointment_id=appointment_id)
         old_status = appointment.status
         
         logger.info(f"Confirming appointment #{appointment_id} from status '{old_status}' to 'confirmed'")
         
-        # Update status to confirmed
-        appointment.status = 'confirmed'
-        appointment.save()
-        
-        # Send confirmation email to patient
-        email_sent = False
-        try:
+        # Update status to confirmed and queue the confirmation email to the patient
+        with transaction.atomic():
+            appointment.status = 'confirmed'
+            appointment.save()
             email_sent = send_appointment_status_update_email(appointment, old_status)
-        except Exception as e:
-            logger.error(f"Error sending confirmation email: {str(e)}")
         
         return Response({
             'success': True,
             'message': 'Appointment confirmed successfully',
             'email_sent': email_sent,
             'appointment': {
-                'id': appointment.id,
-                'name': appointment.name,
-                'email': appointment.email,
+                'id': str(appointment.appointment_id),
+                'name': appointment.patient_name,
+                'email': appointment.patient_email,
                 'status': appointment.status,
                 'updated_at': appointment.updated_at.isoformat(),
             }
@@ -628,37 +1011,32 @@ def cancel_appointment(request, appointment_id):
     
     # Simple security check - verify appointment exists and is pending
     try:
-        appointment = Appointment.objects.get(id=appointment_id)
+        appointment = Appointment.objects.get(appointment_id=appointment_id)
         if appointment.status != 'pending':
             return Response({'error': 'Appointment is not in pending status'}, status=status.HTTP_400_BAD_REQUEST)
     except Appointment.DoesNotExist:
         return Response({'error': 'Appointment not found'}, status=status.HTTP_404_NOT_FOUND)
     
     try:
-        appointment = Appointment.objects.get(id=appointment_id)
+        appointment = Appointment.objects.get(appointment_id=appointment_id)
         old_status = appointment.status
         
         logger.info(f"Cancelling appointment #{appointment_id} from status '{old_status}' to 'cancelled'")
         
-        # Update status to cancelled
-        appointment.status = 'cancelled'
-        appointment.save()
-        
-        # Send cancellation email to patient
-        email_sent = False
-        try:
+        # Update status to cancelled and queue the cancellation email to the patient
+        with transaction.atomic():
+            appointment.status = 'cancelled'
+            appointment.save()
             email_sent = send_appointment_status_update_email(appointment, old_status)
-        except Exception as e:
-            logger.error(f"Error sending cancellation email: {str(e)}")
         
         return Response({
             'success': True,
             'message': 'Appointment cancelled successfully',
             'email_sent': email_sent,
             'appointment': {
-                'id': appointment.id,
-                'name': appointment.name,
-                'email': appointment.email,
+                'id': str(appointment.appointment_id),
+                'name': appointment.patient_name,
+                'email': appointment.patient_email,
                 'status': appointment.status,
                 'updated_at': appointment.updated_at.isoformat(),
             }
@@ -682,7 +1060,7 @@ def admin_appointment_action(request, appointment_id, action):
     Handle admin email actions (confirm/cancel) and return a response page
     """
     try:
-        appointment = get_object_or_404(Appointment, id=appointment_id)
+        appointment = get_object_or_404(Appointment, appointment_id=appointment_id)
         
         # Check if appointment is already in the target status
         if action == 'confirm' and appointment.status == 'confirmed':
@@ -733,14 +1111,10 @@ def admin_appointment_action(request, appointment_id, action):
             }
             return render(request, 'appointment/admin_action_response.html', context)
         
-        appointment.save()
-        
-        # Send status update email to patient
-        email_sent = False
-        try:
+        # Save and queue the status update email to the patient together
+        with transaction.atomic():
+            appointment.save()
             email_sent = send_appointment_status_update_email(appointment, old_status)
-        except Exception as e:
-            logger.error(f"Error sending status update email: {str(e)}")
         
         context = {
             'success': True,
@@ -773,49 +1147,151 @@ def admin_appointment_action(request, appointment_id, action):
 @api_view(['GET'])
 @permission_classes([])  # Public endpoint for patients
 def get_available_slots(request):
-    """Get available time slots for the next day"""
+    """Get available time slots for the next day, or for a date range via ?from=&to="""
     from datetime import timedelta
     
     # Get next day's date
     tomorrow = date.today() + timedelta(days=1)
     target_date = tomorrow
+
+    doctor_ids, error_response = _get_doctor_ids(request)
+    if error_response:
+        return error_response
+
+    if 'from' in request.GET or 'to' in request.GET:
+        return _get_available_slots_for_range(request, tomorrow, doctor_ids)
     
     try:
+        # Answer repeat polls from the cached versions alone, without the ORM
+        versions = get_slot_versions(target_date)
+        etag = make_etag('slots', target_date.isoformat(), request.GET.get('doctor_id', ''), *versions)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+
         # Get only available slots for next day (completely excluding booked and blocked slots)
-        available_slots = get_only_available_slots_for_date(target_date)
+        available_slots = get_cached_available_slots(target_date, versions, doctor_ids)
         
-        return Response({
+        return with_etag(Response({
             'success': True,
             'date': target_date.strftime('%Y-%m-%d'),
             'available_slots': available_slots,
             'total_available': len(available_slots)
-        })
+        }), etag)
 
     except Exception as e:
         logger.error(f"Error getting available slots for next day: {str(e)}")
         return Response({'error': f'Server error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _get_available_slots_for_range(request, default_start, doctor_ids=None):
+    """Build the multi-day calendar response for get_available_slots"""
+    from_param = request.GET.get('from')
+    to_param = request.GET.get('to')
+
+    try:
+        start_date = datetime.strptime(from_param, '%Y-%m-%d').date() if from_param else default_start
+        end_date = (
+            datetime.strptime(to_param, '%Y-%m-%d').date() if to_param
+            else start_date + timedelta(days=29)
+        )
+    except ValueError:
+        return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if start_date < date.today():
+        return Response({'error': 'Date range cannot start in the past'}, status=status.HTTP_400_BAD_REQUEST)
+    if end_date < start_date:
+        return Response({'error': "'to' must be on or after 'from'"}, status=status.HTTP_400_BAD_REQUEST)
+    if (end_date - start_date).days + 1 > MAX_CALENDAR_DAYS:
+        return Response({
+            'error': f'Date range cannot exceed {MAX_CALENDAR_DAYS} days'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        days = get_available_slots_for_range(start_date, end_date, doctor_ids)
+
+        return Response({
+            'success': True,
+            'from': start_date.strftime('%Y-%m-%d'),
+            'to': end_date.strftime('%Y-%m-%d'),
+            'days': days,
+            'total_available': sum(day['total_available'] for day in days)
+        })
+
+    except Exception as e:
+        logger.error(f"Error getting available slots for range: {str(e)}")
+        return Response({'error': f'Server error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(['GET'])
-@permission_classes([IsAuthenticated])
+@permission_classes([])  # Public endpoint for patients
+def get_next_available_slots(request):
+    """Get the earliest free slots, searching forward from ?after= (default now)"""
+    doctor_ids, error_response = _get_doctor_ids(request)
+    if error_response:
+        return error_response
+
+    try:
+        count = int(request.GET.get('count', 1))
+    except ValueError:
+        return Response({'error': 'count must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= count <= MAX_NEXT_AVAILABLE_SLOTS:
+        return Response({
+            'error': f'count must be between 1 and {MAX_NEXT_AVAILABLE_SLOTS}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    after = None
+    after_param = request.GET.get('after')
+    if after_param:
+        try:
+            after = datetime.fromisoformat(after_param)
+        except ValueError:
+            return Response({
+                'error': 'Invalid after format. Use YYYY-MM-DD or YYYY-MM-DDTHH:MM'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if after.tzinfo:
+            after = timezone.localtime(after).replace(tzinfo=None)
+
+    try:
+        slots = find_next_available_slots(count, after, doctor_ids)
+
+        return Response({
+            'success': True,
+            'available_slots': slots,
+            'total_available': len(slots)
+        })
+
+    except Exception as e:
+        logger.error(f"Error finding next available slots: {str(e)}")
+        return Response({'error': f'Server error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsClinicAdmin])
 def get_detailed_slots(request):
     """Get detailed slot information including booked slots (admin only)"""
-    # Check if user is admin
-    if not (request.user.is_staff or request.user.is_superuser):
-        return Response({'error': 'Admin privileges required'}, status=status.HTTP_403_FORBIDDEN)
-
     date_param = request.GET.get('date')
     
     if not date_param:
         return Response({'error': 'Date parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+    doctor_ids, error_response = _get_doctor_ids(request)
+    if error_response:
+        return error_response
 
     try:
         target_date = datetime.strptime(date_param, '%Y-%m-%d').date()
+
+        # Slots only change when availability or that date's bookings change
+        etag = make_etag(
+            'detailed-slots', target_date.isoformat(), request.GET.get('doctor_id', ''),
+            *get_slot_versions(target_date)
+        )
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
         
         # Get all slots with detailed information
-        slots_data = get_available_slots_for_date(target_date)
+        slots_data = get_available_slots_for_date(target_date, doctor_ids)
         
-        return Response({
+        return with_etag(Response({
             'success': True,
             'date': date_param,
             'slots': slots_data['slots'],
@@ -825,7 +1301,7 @@ def get_detailed_slots(request):
                 'booked_slots': slots_data['booked_slots'],
                 'blocked_slots': slots_data['blocked_slots']
             }
-        })
+        }), etag)
 
     except ValueError:
         return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
@@ -843,18 +1319,28 @@ def book_appointment(request):
         if not serializer.is_valid():
             return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Check if slot is available
-        from .utils import is_slot_available
-        if not is_slot_available(
-            serializer.validated_data['appointment_date'],
-            serializer.validated_data['appointment_time']
-        ):
-            return Response({
-                'error': 'This time slot is no longer available. Please select another time.'
-            }, status=status.HTTP_400_BAD_REQUEST)
+        # Check the slot and create the appointment atomically; the database
+        # rejects a second active booking for the same doctor and slot
+        doctor = serializer.validated_data.get('doctor')
+        try:
+            with transaction.atomic():
+                available_doctors = get_available_doctors_for_slot(
+                    serializer.validated_data['appointment_date'],
+                    serializer.validated_data['appointment_time'],
+                    [doctor.pk] if doctor else None
+                )
+                if not available_doctors:
+                    return Response({
+                        'error': 'This time slot is no longer available. Please select another time.'
+                    }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Create appointment
-        appointment = serializer.save()
+                # Book the requested doctor, or else the first one free at that time
+                serializer.validated_data.pop('doctor', None)
+                appointment = serializer.save(doctor_id=available_doctors[0])
+        except IntegrityError:
+            return Response({
+                'error': 'This time slot was just booked by someone else. Please select another time.'
+            }, status=status.HTTP_409_CONFLICT)
         
         return Response({
             'success': True,
@@ -868,13 +1354,9 @@ def book_appointment(request):
 
 
 @api_view(['GET'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsClinicAdmin])
 def get_appointments(request):
     """Get appointments (admin only)"""
-    # Check if user is admin
-    if not (request.user.is_staff or request.user.is_superuser):
-        return Response({'error': 'Admin privileges required'}, status=status.HTTP_403_FORBIDDEN)
-
     try:
         appointments = Appointment.objects.all().order_by('-created_at')
         serializer = AppointmentSerializer(appointments, many=True)
@@ -887,3 +1369,13 @@ def get_appointments(request):
     except Exception as e:
         logger.error(f"Error getting appointments: {str(e)}")
         return Response({'error': f'Server error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsFullClinicAdmin])
+def get_request_metrics(request):
+    """Get per-endpoint latency and query-count percentiles for this worker (admin only)"""
+    return Response({
+        'success': True,
+        'metrics': request_metrics.summary()
+    })
@@ -0,0 +1,95 @@
+"""
+JWT authentication backed by claims embedded in the access token
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .blacklist import is_jti_blacklisted
+
+
+# User fields copied into every access token at issue time
+USER_CLAIMS = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'is_superuser')
+
+# When the claims above were read from the database
+CLAIMS_ISSUED_AT_CLAIM = 'claims_iat'
+
+USER_CHANGED_CACHE_KEY = 'auth:user_changed:{user_id}'
+
+
+def add_user_claims(token, user):
+    """Embed the user's authorization fields in a token"""
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    token[CLAIMS_ISSUED_AT_CLAIM] = time.time()
+    return token
+
+
+def mark_user_changed(user_id):
+    """
+    Record that a user's stored fields changed so tokens issued before now
+    fall back to a database lookup. The marker only needs to outlive the
+    access tokens it overrides.
+    """
+    timeout = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+    cache.set(USER_CHANGED_CACHE_KEY.format(user_id=user_id), time.time(), timeout)
+
+
+def get_user_changed_at(user_id):
+    return cache.get(USER_CHANGED_CACHE_KEY.format(user_id=user_id))
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token that mints access tokens with current user claims"""
+
+    def check_blacklist(self):
+        # Answer from the cache when it knows, otherwise query the table
+        blacklisted = is_jti_blacklisted(self.payload[api_settings.JTI_CLAIM])
+        if blacklisted is None:
+            return super().check_blacklist()
+        if blacklisted:
+            raise TokenError('Token is blacklisted')
+
+    @property
+    def access_token(self):
+        access = super().access_token
+
+        # Re-read the user so refreshed claims reflect deactivation and role changes
+        user_id = self.payload.get(api_settings.USER_ID_CLAIM)
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None or not user.is_active:
+            raise TokenError('User is inactive or no longer exists')
+
+        return add_user_claims(access, user)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    Authenticate from the token's embedded claims without loading the user
+    row. Tokens without claims, or issued before the user last changed, go
+    through the regular database lookup, as does everything when the
+    user-changed markers aren't in a shared cache.
+    """
+
+    def get_user(self, validated_token):
+        if not settings.AUTH_CLAIMS_SHARED_CACHE:
+            return super().get_user(validated_token)
+
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        claims_issued_at = validated_token.get(CLAIMS_ISSUED_AT_CLAIM)
+        if user_id is None or claims_issued_at is None:
+            return super().get_user(validated_token)
+
+        changed_at = get_user_changed_at(user_id)
+        if changed_at is not None and changed_at >= claims_issued_at:
+            return super().get_user(validated_token)
+
+        return TokenUser(validated_token)
@@ -0,0 +1,100 @@
+"""
+Cache-backed fast path for refresh token blacklist checks
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+BLACKLISTED_JTI_CACHE_KEY = 'auth:blacklisted_jti:{jti}'
+
+# Set once every unexpired blacklisted JTI has been copied into the cache.
+# While present, a cache miss means the token is not blacklisted.
+BLACKLIST_CACHE_WARM_KEY = 'auth:blacklist_cache_warm'
+
+
+def _blacklist_timeout():
+    # A blacklisted refresh token can't outlive one refresh lifetime, and
+    # expired tokens are rejected before the blacklist matters
+    return int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+
+
+def remember_blacklisted_jti(jti):
+    cache.set(BLACKLISTED_JTI_CACHE_KEY.format(jti=jti), True, _blacklist_timeout())
+
+
+def is_jti_blacklisted(jti):
+    """
+    Check the blacklist without touching the database when possible.
+
+    A cached JTI is always blacklisted. A miss is only trusted when the
+    cache is shared by every worker and has been warmed; otherwise the
+    caller gets None and must query the table.
+    """
+    key = BLACKLISTED_JTI_CACHE_KEY.format(jti=jti)
+    if not settings.TOKEN_BLACKLIST_SHARED_CACHE:
+        return True if cache.get(key) else None
+
+    cached = cache.get_many([key, BLACKLIST_CACHE_WARM_KEY])
+    if key in cached:
+        return True
+    if BLACKLIST_CACHE_WARM_KEY in cached:
+        return False
+    return None
+
+
+def warm_blacklist_cache(chunk_size=1000):
+    """Copy every unexpired blacklisted JTI into the cache and mark it complete"""
+    if not settings.TOKEN_BLACKLIST_SHARED_CACHE:
+        return 0
+
+    timeout = _blacklist_timeout()
+    jtis = (
+        BlacklistedToken.objects
+        .filter(token__expires_at__gt=timezone.now())
+        .values_list('token__jti', flat=True)
+        .iterator(chunk_size=chunk_size)
+    )
+
+    count = 0
+    chunk = {}
+    for jti in jtis:
+        chunk[BLACKLISTED_JTI_CACHE_KEY.format(jti=jti)] = True
+        if len(chunk) >= chunk_size:
+            cache.set_many(chunk, timeout)
+            count += len(chunk)
+            chunk = {}
+    if chunk:
+        cache.set_many(chunk, timeout)
+        count += len(chunk)
+
+    # Tokens blacklisted while this ran were cached by the post_save signal
+    cache.set(BLACKLIST_CACHE_WARM_KEY, True, None)
+    return count
+
+
+def prune_expired_tokens(batch_size=1000):
+    """
+    Delete expired outstanding tokens and their blacklist entries in batches
+    so no single statement locks the tables for long. Returns the number of
+    outstanding tokens removed.
+    """
+    now = timezone.now()
+    deleted = 0
+
+    while True:
+        ids = list(
+            OutstandingToken.objects
+            .filter(expires_at__lte=now)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+
+        BlacklistedToken.objects.filter(token_id__in=ids).delete()
+        OutstandingToken.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
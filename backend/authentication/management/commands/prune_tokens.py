@@ -0,0 +1,28 @@
+"""
+Management command to prune expired JWT refresh tokens
+"""
+
+from django.core.management.base import BaseCommand
+
+from authentication.blacklist import prune_expired_tokens, warm_blacklist_cache
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted refresh tokens in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Tokens deleted per statement (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_expired_tokens(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} expired tokens'))
+
+        # Rebuild the blacklist cache so refresh checks can trust cache misses
+        cached = warm_blacklist_cache()
+        if cached:
+            self.stdout.write(f'Cached {cached} blacklisted tokens')
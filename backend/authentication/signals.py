@@ -0,0 +1,62 @@
+"""
+Signal handlers for authentication
+"""
+
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .authentication import mark_user_changed
+from .blacklist import remember_blacklisted_jti
+from .permissions import invalidate_clinic_role
+
+
+# Saves that only touch these fields leave token claims valid
+CLAIM_NEUTRAL_FIELDS = {'last_login'}
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    """Force tokens with stale claims back onto the database lookup"""
+    if update_fields is not None and set(update_fields) <= CLAIM_NEUTRAL_FIELDS:
+        return
+    mark_user_changed(instance.pk)
+    invalidate_clinic_role(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    mark_user_changed(instance.pk)
+    invalidate_clinic_role(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drop cached roles when group membership changes from either side"""
+    if reverse and action == 'pre_clear':
+        # group.user_set.clear() doesn't say which users it removes
+        for user_id in User.objects.filter(groups=instance).values_list('pk', flat=True):
+            invalidate_clinic_role(user_id)
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            invalidate_clinic_role(instance.pk)
+        else:
+            for user_id in pk_set or ():
+                invalidate_clinic_role(user_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    """Drop cached roles of a group's members when it is renamed or deleted"""
+    # Deleting a group removes its memberships without m2m_changed
+    for user_id in instance.user_set.values_list('pk', flat=True):
+        invalidate_clinic_role(user_id)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def token_blacklisted(sender, instance, created, **kwargs):
+    """Cache the JTI as soon as it's blacklisted so refresh checks skip the table"""
+    if created:
+        remember_blacklisted_jti(instance.token.jti)
@@ -0,0 +1,92 @@
+"""
+Tests for authentication
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from .permissions import FRONT_DESK_ROLE, get_clinic_role
+from .throttling import check_login_throttle, record_login_failure, reset_login_failures
+
+
+class ClinicRoleTests(TestCase):
+    """Group-based clinic roles"""
+
+    def setUp(self):
+        cache.clear()
+        self.group = Group.objects.create(name='Front Desk')
+        self.user = User.objects.create_user('desk', 'desk@example.com', 'pw')
+        self.user.groups.add(self.group)
+
+    @override_settings(CLINIC_ROLE_SHARED_CACHE=False)
+    def test_unshared_role_is_not_cached(self):
+        self.assertEqual(get_clinic_role(self.user), FRONT_DESK_ROLE)
+        # A change made in another worker sends no signal to this one
+        self.group.user_set.through.objects.filter(user=self.user).delete()
+        self.assertIsNone(get_clinic_role(self.user))
+
+    @override_settings(CLINIC_ROLE_SHARED_CACHE=True)
+    def test_shared_role_is_cleared_when_the_group_changes(self):
+        self.assertEqual(get_clinic_role(self.user), FRONT_DESK_ROLE)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_clinic_role(self.user), FRONT_DESK_ROLE)
+
+        self.group.name = 'Former Front Desk'
+        self.group.save()
+        self.assertIsNone(get_clinic_role(self.user))
+
+        self.group.name = 'Front Desk'
+        self.group.save()
+        self.assertEqual(get_clinic_role(self.user), FRONT_DESK_ROLE)
+        self.group.delete()
+        self.assertIsNone(get_clinic_role(self.user))
+
+
+@override_settings(
+    LOGIN_THROTTLE_ENABLED=True,
+    LOGIN_THROTTLE_WINDOW=3600,
+    LOGIN_THROTTLE_IP_LIMIT=20,
+    LOGIN_THROTTLE_USERNAME_LIMIT=5,
+    LOGIN_LOCKOUT_THRESHOLD=3,
+    LOGIN_LOCKOUT_BASE_SECONDS=30,
+    LOGIN_LOCKOUT_MAX_SECONDS=3600,
+    LOGIN_TRUSTED_PROXIES=0,
+)
+class LoginThrottleTests(SimpleTestCase):
+    """Login rate limits and lockout"""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def attempt(self, username='desk', ip='10.0.0.1'):
+        return check_login_throttle(self.factory.post('/', REMOTE_ADDR=ip), username)
+
+    def test_username_limit(self):
+        for _ in range(5):
+            self.assertIsNone(self.attempt())
+        self.assertGreater(self.attempt(), 0)
+        # Other usernames from the same client are still let through
+        self.assertIsNone(self.attempt(username='other'))
+
+    def test_ip_limit(self):
+        for index in range(20):
+            self.assertIsNone(self.attempt(username=f'user{index}'))
+        self.assertGreater(self.attempt(username='fresh'), 0)
+        self.assertIsNone(self.attempt(username='fresh', ip='10.0.0.2'))
+
+    def test_concurrent_burst_cannot_exceed_the_limit(self):
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            results = list(executor.map(lambda _: self.attempt(), range(30)))
+        self.assertEqual(sum(result is None for result in results), 5)
+
+    def test_concurrent_failures_lock_the_username(self):
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            list(executor.map(lambda _: record_login_failure('Desk'), range(3)))
+        self.assertGreater(self.attempt(), 0)
+
+        reset_login_failures('desk')
+        self.assertIsNone(self.attempt())
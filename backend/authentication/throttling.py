@@ -0,0 +1,111 @@
+"""
+Login rate limiting and lockout, checked before any password is hashed
+"""
+
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+LOGIN_WINDOW_CACHE_KEY = 'auth:login_window:{scope}:{ident}:{bucket}'
+LOGIN_FAILURES_CACHE_KEY = 'auth:login_failures:{username}'
+LOGIN_LOCKED_UNTIL_CACHE_KEY = 'auth:login_locked_until:{username}'
+
+
+def get_client_ip(request):
+    """
+    Client address for throttling. X-Forwarded-For is only trusted for the
+    number of proxies configured in LOGIN_TRUSTED_PROXIES, since clients
+    can set it to anything.
+    """
+    remote_addr = request.META.get('REMOTE_ADDR', '')
+    forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    proxies = settings.LOGIN_TRUSTED_PROXIES
+    if forwarded_for and proxies:
+        addresses = [address.strip() for address in forwarded_for.split(',')]
+        return addresses[-min(proxies, len(addresses))]
+    return remote_addr
+
+
+def _normalize_username(username):
+    return (username or '').strip().lower()
+
+
+def _increment(key, timeout):
+    """Atomically count a hit, starting the counter when there is none"""
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add and incr
+        cache.set(key, 1, timeout)
+        return 1
+
+
+def check_login_throttle(request, username):
+    """
+    Count a login attempt against the per-IP and per-username fixed
+    windows and check any active lockout. Returns the seconds to wait when
+    the attempt must be rejected, otherwise None.
+    """
+    if not settings.LOGIN_THROTTLE_ENABLED:
+        return None
+
+    now = time.time()
+    username = _normalize_username(username)
+    locked_until = cache.get(LOGIN_LOCKED_UNTIL_CACHE_KEY.format(username=username))
+    if locked_until and locked_until > now:
+        return math.ceil(locked_until - now)
+
+    window = settings.LOGIN_THROTTLE_WINDOW
+    bucket = int(now // window)
+    limits = {
+        LOGIN_WINDOW_CACHE_KEY.format(scope='ip', ident=get_client_ip(request), bucket=bucket):
+            settings.LOGIN_THROTTLE_IP_LIMIT,
+        LOGIN_WINDOW_CACHE_KEY.format(scope='user', ident=username, bucket=bucket):
+            settings.LOGIN_THROTTLE_USERNAME_LIMIT,
+    }
+    # Counting with incr lets concurrent attempts each see the others
+    counts = [(_increment(key, window), limit) for key, limit in limits.items()]
+    if any(count > limit for count, limit in counts):
+        return max(1, math.ceil((bucket + 1) * window - now))
+    return None
+
+
+def record_login_failure(username):
+    """
+    Count a failed password check. Past LOGIN_LOCKOUT_THRESHOLD failures the
+    username is locked out, doubling the lockout with each further failure.
+    """
+    if not settings.LOGIN_THROTTLE_ENABLED:
+        return
+
+    username = _normalize_username(username)
+    failures_key = LOGIN_FAILURES_CACHE_KEY.format(username=username)
+    failures = _increment(failures_key, settings.LOGIN_LOCKOUT_MAX_SECONDS)
+    # Keep counting until a quiet LOGIN_LOCKOUT_MAX_SECONDS after the last failure
+    cache.touch(failures_key, settings.LOGIN_LOCKOUT_MAX_SECONDS)
+
+    if failures >= settings.LOGIN_LOCKOUT_THRESHOLD:
+        lockout = min(
+            settings.LOGIN_LOCKOUT_BASE_SECONDS * 2 ** (failures - settings.LOGIN_LOCKOUT_THRESHOLD),
+            settings.LOGIN_LOCKOUT_MAX_SECONDS,
+        )
+        cache.set(
+            LOGIN_LOCKED_UNTIL_CACHE_KEY.format(username=username),
+            time.time() + lockout,
+            lockout,
+        )
+
+
+def reset_login_failures(username):
+    if not settings.LOGIN_THROTTLE_ENABLED:
+        return
+
+    username = _normalize_username(username)
+    cache.delete_many([
+        LOGIN_FAILURES_CACHE_KEY.format(username=username),
+        LOGIN_LOCKED_UNTIL_CACHE_KEY.format(username=username),
+    ])
@@ -3,7 +3,6 @@ URL configuration for authentication app
 """
 
 from django.urls import path
-from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
     LoginView,
     logout_view,
@@ -12,6 +11,7 @@ from .views import (
     check_admin,
     refresh_token_view,
     CustomTokenObtainPairView,
+    CustomTokenRefreshView,
 )
 
 app_name = 'authentication'
@@ -21,7 +21,7 @@ urlpatterns = [
     path('login/', LoginView.as_view(), name='login'),
     path('logout/', logout_view, name='logout'),
     path('token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
     path('token/verify/', verify_token, name='verify_token'),
     
     # User endpoints
@@ -12,13 +12,21 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 import json
 
+from .authentication import ClaimsRefreshToken
+from .permissions import ADMIN_ROLE, get_clinic_role, has_clinic_capability
+from .throttling import check_login_throttle, record_login_failure, reset_login_failures
+
+TOO_MANY_ATTEMPTS_ERROR = 'Too many login attempts. Please try again later.'
+
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = ClaimsRefreshToken
+
     def validate(self, attrs):
         data = super().validate(attrs)
         refresh = self.get_token(self.user)
@@ -40,6 +48,35 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
+    def post(self, request, *args, **kwargs):
+        username = request.data.get('username')
+
+        # Reject throttled attempts before the password is hashed
+        retry_after = check_login_throttle(request, username)
+        if retry_after:
+            return Response(
+                {'error': TOO_MANY_ATTEMPTS_ERROR},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={'Retry-After': str(retry_after)}
+            )
+
+        try:
+            response = super().post(request, *args, **kwargs)
+        except AuthenticationFailed:
+            record_login_failure(username)
+            raise
+
+        reset_login_failures(username)
+        return response
+
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = ClaimsRefreshToken
+
+
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
+
 
 @method_decorator(csrf_exempt, name='dispatch')
 class LoginView(View):
@@ -56,13 +93,23 @@ class LoginView(View):
                     'error': 'Username and password are required'
                 }, status=400)
             
+            # Reject throttled attempts before the password is hashed
+            retry_after = check_login_throttle(request, username)
+            if retry_after:
+                response = JsonResponse({
+                    'error': TOO_MANY_ATTEMPTS_ERROR
+                }, status=429)
+                response['Retry-After'] = str(retry_after)
+                return response
+            
             # Authenticate user
             user = authenticate(username=username, password=password)
             
             if user is not None:
+                reset_login_failures(username)
                 if user.is_active:
-                    # Generate JWT tokens
-                    refresh = RefreshToken.for_user(user)
+                    # Generate JWT tokens carrying the user's claims
+                    refresh = CustomTokenObtainPairSerializer.get_token(user)
                     
                     return JsonResponse({
                         'success': True,
@@ -86,6 +133,7 @@ class LoginView(View):
                         'error': 'Account is disabled'
                     }, status=403)
             else:
+                record_login_failure(username)
                 return JsonResponse({
                     'error': 'Invalid username or password'
                 }, status=401)
@@ -107,7 +155,7 @@ def logout_view(request):
     try:
         refresh_token = request.data.get('refresh')
         if refresh_token:
-            token = RefreshToken(refresh_token)
+            token = ClaimsRefreshToken(refresh_token)
             token.blacklist()
             return Response({
                 'success': True,
@@ -155,7 +203,8 @@ def verify_token(request):
 def user_profile(request):
     """Get current user profile information."""
     try:
-        user = request.user
+        # Token claims don't carry account dates, so load the full row
+        user = User.objects.get(pk=request.user.id)
         return Response({
             'success': True,
             'user': {
@@ -182,16 +231,20 @@ def check_admin(request):
     """Check if the current user is an admin (staff or superuser)."""
     try:
         user = request.user
-        is_admin = user.is_staff or user.is_superuser
+        role = get_clinic_role(user)
+        is_admin = role == ADMIN_ROLE
         
         return Response({
             'success': True,
             'is_admin': is_admin,
             'is_staff': user.is_staff,
             'is_superuser': user.is_superuser,
+            'role': role,
             'permissions': {
-                'can_access_admin': is_admin,
-                'can_manage_appointments': is_admin,
+                'can_access_admin': role is not None,
+                'can_manage_appointments': has_clinic_capability(user, 'change'),
+                'can_delete_appointments': has_clinic_capability(user, 'delete'),
+                'can_manage_schedule': has_clinic_capability(user, 'manage'),
                 'can_manage_users': user.is_superuser,
             }
         })
@@ -213,7 +266,7 @@ def refresh_token_view(request):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            refresh = RefreshToken(refresh_token)
+            refresh = ClaimsRefreshToken(refresh_token)
             access_token = refresh.access_token
             
             return Response({
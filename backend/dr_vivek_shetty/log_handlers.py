@@ -0,0 +1,119 @@
+"""
+Non-blocking logging handlers for the project.
+
+Request threads only put records on an in-memory queue; a background
+QueueListener writes them to the console and a JSON log file.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+
+_handlers = []
+_started = False
+
+
+class JsonFormatter(logging.Formatter):
+    """Format log records as one JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class QueuedLogHandler(QueueHandler):
+    """Queue handler feeding a console sink and a JSON file sink.
+
+    Every worker process appends to the same file, so rotation is left to an
+    external tool such as logrotate; the file handler reopens the file once
+    it has been moved. The file is opened here so a bad path fails at startup.
+
+    The listener thread is started by start_log_listeners() from
+    AppointmentsConfig.ready(); records logged before then wait in the queue.
+    A process forked after that (gunicorn --preload) gets its own queue and
+    listener thread, since threads don't survive fork().
+    """
+
+    def __init__(self, filename, file_level='ERROR', console_level='INFO'):
+        super().__init__(queue.SimpleQueue())
+
+        file_handler = WatchedFileHandler(filename, encoding='utf-8')
+        file_handler.setLevel(file_level)
+        file_handler.setFormatter(JsonFormatter())
+
+        console_handler = logging.StreamHandler(sys.stderr)
+        console_handler.setLevel(console_level)
+
+        self.listener = QueueListener(
+            self.queue,
+            console_handler,
+            file_handler,
+            respect_handler_level=True
+        )
+        _handlers.append(self)
+
+    def prepare(self, record):
+        """Make the record safe to hand to another thread, keeping the traceback separate"""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def start_log_listeners():
+    """Start every queued handler's listener thread and flush them at exit"""
+    global _started
+    if _started:
+        return
+
+    for handler in _handlers:
+        handler.listener.start()
+    atexit.register(stop_log_listeners)
+    _started = True
+
+
+def stop_log_listeners():
+    """Flush queued records and stop the listener threads"""
+    global _started
+    if not _started:
+        return
+
+    for handler in _handlers:
+        handler.listener.stop()
+    _started = False
+
+
+def _restart_log_listeners_in_child():
+    """Replace the listener threads a forked child didn't inherit"""
+    if not _started:
+        return
+
+    for handler in _handlers:
+        # Records still queued at fork time are written by the parent
+        handler.queue = handler.listener.queue = queue.SimpleQueue()
+        handler.listener.start()
+
+
+os.register_at_fork(after_in_child=_restart_log_listeners_in_child)
@@ -43,8 +43,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Keep last so its view/render timings exclude the other middleware
+    'appointments.middleware.RequestMetricsMiddleware',
 ]
 
+# Per-request query count and latency instrumentation
+REQUEST_METRICS_ENABLED = config('REQUEST_METRICS_ENABLED', default=True, cast=bool)
+REQUEST_METRICS_MAX_SAMPLES = config('REQUEST_METRICS_MAX_SAMPLES', default=500, cast=int)
+
 ROOT_URLCONF = 'dr_vivek_shetty.urls'
 
 TEMPLATES = [
@@ -65,13 +71,64 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'dr_vivek_shetty.wsgi.application'
 
-# Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Database (SQLite by default, PostgreSQL when DB_ENGINE=postgresql)
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='dr_vivek_shetty'),
+            'USER': config('DB_USER', default='postgres'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            # Persistent connections, checked before reuse
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+            'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+            'OPTIONS': {
+                'connect_timeout': config('DB_CONNECT_TIMEOUT', default=10, cast=int),
+            },
+        }
     }
-}
+
+    # Pooled mode: behind a transaction-pooling proxy such as PgBouncer,
+    # server-side cursors can't outlive a transaction
+    if config('DB_POOLED', default=False, cast=bool):
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+        }
+    }
+
+# SQLite connection pragmas, applied in appointments.signals
+SQLITE_BUSY_TIMEOUT = config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int)  # milliseconds
+
+# Cache (shared Redis cache in production, per-process memory cache otherwise)
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Reuse compiled schedules and available-slot lists across requests, keyed by
+# version stamps in the cache. Only safe when every worker shares the cache;
+# otherwise a change in one worker is invisible to the others, so each request
+# rebuilds.
+SCHEDULE_SHARED_CACHE = config('SCHEDULE_SHARED_CACHE', default=bool(REDIS_URL), cast=bool)
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -108,7 +165,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.ClaimsJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -150,6 +207,36 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Clinic roles: members of this group get front-desk access to the admin API
+FRONT_DESK_GROUP = config('FRONT_DESK_GROUP', default='Front Desk')
+CLINIC_ROLE_CACHE_TIMEOUT = config('CLINIC_ROLE_CACHE_TIMEOUT', default=300, cast=int)
+# Cache group roles. Only safe when every worker shares the cache, since a
+# role change only clears the entry where it was made.
+CLINIC_ROLE_SHARED_CACHE = config('CLINIC_ROLE_SHARED_CACHE', default=bool(REDIS_URL), cast=bool)
+
+# Login throttling: fixed windows per client IP and per username, checked
+# before the password is hashed, plus an exponential lockout after repeated
+# failures for the same username. Counters live in the cache, so the limits
+# only hold across workers when the cache is shared.
+LOGIN_THROTTLE_ENABLED = config('LOGIN_THROTTLE_ENABLED', default=True, cast=bool)
+LOGIN_THROTTLE_WINDOW = config('LOGIN_THROTTLE_WINDOW', default=60, cast=int)
+LOGIN_THROTTLE_IP_LIMIT = config('LOGIN_THROTTLE_IP_LIMIT', default=20, cast=int)
+LOGIN_THROTTLE_USERNAME_LIMIT = config('LOGIN_THROTTLE_USERNAME_LIMIT', default=5, cast=int)
+LOGIN_LOCKOUT_THRESHOLD = config('LOGIN_LOCKOUT_THRESHOLD', default=5, cast=int)
+LOGIN_LOCKOUT_BASE_SECONDS = config('LOGIN_LOCKOUT_BASE_SECONDS', default=30, cast=int)
+LOGIN_LOCKOUT_MAX_SECONDS = config('LOGIN_LOCKOUT_MAX_SECONDS', default=3600, cast=int)
+# Reverse proxies in front of the app whose X-Forwarded-For entries are trusted
+LOGIN_TRUSTED_PROXIES = config('LOGIN_TRUSTED_PROXIES', default=0, cast=int)
+
+# Trust cache misses on the refresh token blacklist. Only safe when every
+# worker shares the cache and it doesn't evict keys before they expire.
+TOKEN_BLACKLIST_SHARED_CACHE = config('TOKEN_BLACKLIST_SHARED_CACHE', default=bool(REDIS_URL), cast=bool)
+
+# Authenticate from access token claims without loading the user. Only safe
+# when every worker shares the cache that records user changes; otherwise a
+# deactivated user's older tokens keep working in other workers.
+AUTH_CLAIMS_SHARED_CACHE = config('AUTH_CLAIMS_SHARED_CACHE', default=bool(REDIS_URL), cast=bool)
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -160,32 +247,54 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
-# Email configuration (for development)
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# Email configuration (console backend for development)
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
+# Seconds before a stalled SMTP server fails a send instead of blocking the worker
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=10, cast=int)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@drvivekshetty.com')
+ADMIN_NOTIFICATION_EMAILS = config(
+    'ADMIN_NOTIFICATION_EMAILS',
+    default='vivekshetty.headneck@gmail.com',
+    cast=lambda v: [s.strip() for s in v.split(',') if s.strip()]
+)
+
+# Email outbox (drained by `manage.py send_outbox`)
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', default=50, cast=int)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+EMAIL_OUTBOX_RETRY_DELAY = config('EMAIL_OUTBOX_RETRY_DELAY', default=60, cast=int)  # seconds, doubled per attempt
+EMAIL_OUTBOX_LEASE_SECONDS = config('EMAIL_OUTBOX_LEASE_SECONDS', default=300, cast=int)
 
 # Logging configuration
+# Records go onto a queue and are written by a background listener thread
+# (started in AppointmentsConfig.ready) to the console and a JSON file that
+# is rotated externally (e.g. logrotate)
+LOG_DIR = Path(config('LOG_DIR', default=str(BASE_DIR / 'logs')))
+
+# Create the log directory before the handler opens its file, so a bad
+# location fails at startup
+os.makedirs(LOG_DIR, exist_ok=True)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'handlers': {
-        'file': {
-            'level': 'ERROR',
-            'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'logs' / 'django.log',
-        },
-        'console': {
-            'level': 'INFO',
-            'class': 'logging.StreamHandler',
+        'queue': {
+            'class': 'dr_vivek_shetty.log_handlers.QueuedLogHandler',
+            'filename': LOG_DIR / 'django.log',
+            'file_level': config('LOG_FILE_LEVEL', default='ERROR'),
+            'console_level': config('LOG_CONSOLE_LEVEL', default='INFO'),
         },
     },
     'loggers': {
         'appointments': {
-            'handlers': ['file', 'console'],
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': True,
         },
     },
 }
-
-# Create logs directory if it doesn't exist
-os.makedirs(BASE_DIR / 'logs', exist_ok=True)